@@ -9,6 +9,7 @@ import matplotlib.pyplot as plt
 import random
 import datanetAPI
 import aux_functions as aux
+import pipeline_amostras as pipeline
 import exp_excentricidade_lat_min
 from scipy.stats import sem, t
 
@@ -57,43 +58,11 @@ for topo_idx, (topology_path, topology_name) in enumerate(zip(TOPOLOGY_PATHS, TO
     print(f"PROCESSANDO TOPOLOGIA: {topology_name}")
     print(f"{'='*60}")
     
-    # 1. Carregar dados da topologia
+    # 1. Ler as amostras em fluxo e executar os experimentos da metaheurística
+    # As amostras são decodificadas por uma thread leitora enquanto o solver
+    # roda, sem manter todas em memória
     print("Carregando dados da topologia...")
     print(f"Caminho completo: {os.path.join(PARENT_DIR, topology_path)}")
-    
-    try:
-        reader = datanetAPI.DatanetAPI(os.path.join(PARENT_DIR, topology_path), [])
-        it_topo = iter(reader)
-        
-        # Coletar todas as amostras necessárias
-        latencias_samples = []
-        capacidades_samples = []
-        
-        for k in range(N_TOTAL_EXPERIMENTS):
-            try:
-                dados_sample = next(it_topo)
-                lat, cap = aux.extrai_latencias_capacidades(dados_sample)
-                latencias_samples.append(lat)
-                capacidades_samples.append(cap)
-            except StopIteration:
-                print(f"Aviso: Apenas {k} amostras encontradas (solicitado {N_TOTAL_EXPERIMENTS})")
-                break
-        
-        n_samples_loaded = len(latencias_samples)
-        if n_samples_loaded == 0:
-            print(f"ERRO: Nenhuma amostra carregada para {topology_name}")
-            continue
-        
-        n_nodes = len(latencias_samples[0])
-        print(f"Carregadas {n_samples_loaded} amostras")
-        print(f"Número de nós: {n_nodes}")
-        
-    except Exception as e:
-        print(f"ERRO ao carregar dados para {topology_name}: {e}")
-        print(f"Verificando se o diretório existe: {os.path.exists(os.path.join(PARENT_DIR, topology_path))}")
-        continue
-
-    # 2. Executar todos os experimentos da metaheurística
     print(f"\nExecutando experimentos com metaheurística Excentricidade (Latência mínima)...")
 
     L_max = APP_CONFIG["latencia"]
@@ -101,37 +70,56 @@ for topo_idx, (topology_path, topology_name) in enumerate(zip(TOPOLOGY_PATHS, TO
 
     results_fogs = []
     results_latency = []
+    n_samples_loaded = 0
 
-    for i in range(n_samples_loaded):
-        if (i + 1) % 50 == 0 or (i + 1) == n_samples_loaded:
-            print(f"  Progresso: {i + 1}/{n_samples_loaded}")
-        
-        # Configurar experimento
-        cloud_position = random.randint(0, n_nodes - 1)
-        current_latencias = latencias_samples[i]
-        current_capacidades = capacidades_samples[i]
+    try:
+        reader = datanetAPI.DatanetAPI(os.path.join(PARENT_DIR, topology_path), [], detail="aggregate",
+                                       cache_dir=os.path.join(PARENT_DIR, ".datanet_cache"))
+
+        for i, current_latencias, current_capacidades, _ in pipeline.fluxo_amostras(reader, N_TOTAL_EXPERIMENTS):
+            n_samples_loaded += 1
+            if i == 0:
+                n_nodes = len(current_latencias)
+                print(f"Número de nós: {n_nodes}")
+            if (i + 1) % 50 == 0 or (i + 1) == N_TOTAL_EXPERIMENTS:
+                print(f"  Progresso: {i + 1}/{N_TOTAL_EXPERIMENTS}")
+
+            # Configurar experimento
+            cloud_position = random.randint(0, n_nodes - 1)
+
+            try:
+                # Executar metaheurística
+                resultado = exp_excentricidade_lat_min.solver(
+                    current_latencias, 
+                    current_capacidades, 
+                    L_max, 
+                    C_min, 
+                    L_cloud_fog, 
+                    C_cloud_fog, 
+                    cloud_position
+                )
+                
+                num_fogs = sum(resultado[1])
+                avg_latency = resultado[2]
+                
+                results_fogs.append(num_fogs)
+                results_latency.append(avg_latency / escala_latencia)
+                
+            except Exception as e:
+                print(f"  ERRO no experimento {i}: {e}")
+                continue
         
-        try:
-            # Executar metaheurística
-            resultado = exp_excentricidade_lat_min.solver(
-                current_latencias, 
-                current_capacidades, 
-                L_max, 
-                C_min, 
-                L_cloud_fog, 
-                C_cloud_fog, 
-                cloud_position
-            )
-            
-            num_fogs = sum(resultado[1])
-            avg_latency = resultado[2]
-            
-            results_fogs.append(num_fogs)
-            results_latency.append(avg_latency / escala_latencia)
-            
-        except Exception as e:
-            print(f"  ERRO no experimento {i}: {e}")
-            continue
+    except Exception as e:
+        print(f"ERRO ao carregar dados para {topology_name}: {e}")
+        print(f"Verificando se o diretório existe: {os.path.exists(os.path.join(PARENT_DIR, topology_path))}")
+        continue
+
+    if n_samples_loaded == 0:
+        print(f"ERRO: Nenhuma amostra carregada para {topology_name}")
+        continue
+    if n_samples_loaded < N_TOTAL_EXPERIMENTS:
+        print(f"Aviso: Apenas {n_samples_loaded} amostras encontradas (solicitado {N_TOTAL_EXPERIMENTS})")
+    print(f"Carregadas {n_samples_loaded} amostras")
 
     print(f"Experimentos concluídos: {len(results_fogs)}")
 
@@ -1,14 +1,132 @@
+import collections
+import itertools
+import numpy as np
+
+
 def extrai_latencias_capacidades(dados):
-    n_nodes = len(dados.get_performance_matrix())
-    latencias = []
-    capacidades = []
-    for i in range(n_nodes):
-        latencias.append([])
-        capacidades.append([])
-        for j in range(n_nodes):
-            latencias[i].append(dados.get_performance_matrix()[i, j]["AggInfo"]["AvgDelay"])
-            capacidades[i].append(dados.get_traffic_matrix()[i, j]["AggInfo"]["AvgBw"])
+    if dados.get_aggregate_matrices() is not None:
+        # Amostra decodificada em modo colunar: as matrizes já são densas
+        latencias = dados.get_aggregate_matrix("AvgDelay").tolist()
+        capacidades = dados.get_aggregate_matrix("AvgBw").tolist()
+        n_nodes = len(latencias)
+    else:
+        n_nodes = len(dados.get_performance_matrix())
+        latencias = []
+        capacidades = []
+        for i in range(n_nodes):
+            latencias.append([])
+            capacidades.append([])
+            for j in range(n_nodes):
+                latencias[i].append(dados.get_performance_matrix()[i, j]["AggInfo"]["AvgDelay"])
+                capacidades[i].append(dados.get_traffic_matrix()[i, j]["AggInfo"]["AvgBw"])
     for i in range(n_nodes):
         latencias[i][i] = 5*0.025 # 10ms
         capacidades[i][i] = 1000000
     return latencias, capacidades
+
+
+def extrai_latencias_capacidades_array(dados, dtype=np.float64):
+    """
+    Mesmo resultado de extrai_latencias_capacidades, mas como duas matrizes
+    NumPy (N, N) montadas de uma vez, sem listas intermediárias. Os solvers
+    aceitam essas matrizes no lugar das listas.
+
+    Args:
+        dados (Sample): Amostra do DatanetAPI
+        dtype: Tipo das matrizes (np.float64 ou np.float32)
+
+    Returns:
+        tuple: (latencias, capacidades)
+    """
+    n_nodes = _numero_nos(dados)
+    latencias = np.empty((n_nodes, n_nodes), dtype=dtype)
+    capacidades = np.empty((n_nodes, n_nodes), dtype=dtype)
+    _preenche_latencias_capacidades(dados, latencias, capacidades)
+    return latencias, capacidades
+
+
+def _numero_nos(dados):
+    if dados.get_aggregate_matrices() is not None:
+        return len(dados.get_aggregate_matrix("AvgDelay"))
+    return len(dados.get_performance_matrix())
+
+
+def _preenche_latencias_capacidades(dados, latencias, capacidades):
+    """
+    Escreve as matrizes de latência e capacidade da amostra nos arrays (N, N)
+    latencias e capacidades, com a diagonal substituída.
+    """
+    if dados.get_aggregate_matrices() is not None:
+        latencias[...] = dados.get_aggregate_matrix("AvgDelay")
+        capacidades[...] = dados.get_aggregate_matrix("AvgBw")
+    else:
+        n_nodes = len(latencias)
+        latencias[...] = np.fromiter((d["AggInfo"]["AvgDelay"] for d in dados.get_performance_matrix().flat),
+                                     dtype=np.float64, count=n_nodes * n_nodes).reshape(n_nodes, n_nodes)
+        capacidades[...] = np.fromiter((d["AggInfo"]["AvgBw"] for d in dados.get_traffic_matrix().flat),
+                                       dtype=np.float64, count=n_nodes * n_nodes).reshape(n_nodes, n_nodes)
+    np.fill_diagonal(latencias, 5*0.025) # 10ms
+    np.fill_diagonal(capacidades, 1000000)
+
+
+def extrai_lote_latencias_capacidades(amostras, n_amostras, dtype=np.float64, em_ms=False):
+    """
+    Extrai as latências e capacidades de várias amostras para dois tensores
+    (S, N, N) contíguos, alocados uma única vez.
+
+    Args:
+        amostras: DatanetAPI, iterador de amostras, ou a tupla (reader, ids)
+            para ler as amostras reader[id] pelo índice de linhas, um arquivo
+            tar por vez
+        n_amostras (int): Número máximo de amostras S (ignorado com ids)
+        dtype: Tipo dos tensores (np.float64 ou np.float32)
+        em_ms (bool): Se True, as latências são convertidas para ms
+            (divididas por 0.025/2, a escala usada pelos solvers)
+
+    Returns:
+        tuple: (latencias, capacidades), com forma (S, N, N), onde S pode ser
+        menor que n_amostras se as amostras acabarem antes
+    """
+    if isinstance(amostras, tuple):
+        reader, ids = amostras
+        ids = list(ids)
+        it = pares = _amostras_por_arquivo(reader, ids)
+        n_amostras = len(ids)
+    else:
+        it = iter(amostras)
+        pares = enumerate(it)
+    latencias = capacidades = None
+    lidas = 0
+    try:
+        # islice para antes de pedir a amostra seguinte, sem ler outro tar
+        for posicao, dados in itertools.islice(pares, n_amostras):
+            if latencias is None:
+                n_nodes = _numero_nos(dados)
+                latencias = np.empty((n_amostras, n_nodes, n_nodes), dtype=dtype)
+                capacidades = np.empty((n_amostras, n_nodes, n_nodes), dtype=dtype)
+            _preenche_latencias_capacidades(dados, latencias[posicao], capacidades[posicao])
+            lidas += 1
+    finally:
+        # Libera o arquivo tar.gz se o iterador do DatanetAPI for interrompido
+        if hasattr(it, "close"):
+            it.close()
+    if latencias is None:
+        return np.empty((0, 0, 0), dtype=dtype), np.empty((0, 0, 0), dtype=dtype)
+    latencias, capacidades = latencias[:lidas], capacidades[:lidas]
+    if em_ms:
+        latencias /= 0.025/2
+    return latencias, capacidades
+
+
+def _amostras_por_arquivo(reader, ids):
+    """
+    Gera (posição em ids, amostra) lendo as amostras reader[id] com um take
+    por arquivo tar, para não manter as S amostras em memória ao mesmo tempo.
+    """
+    por_arquivo = collections.defaultdict(list)
+    for posicao, k in enumerate(ids):
+        arquivo, _ = reader.locate(k)
+        por_arquivo[arquivo].append(posicao)
+    for posicoes in por_arquivo.values():
+        for posicao, dados in zip(posicoes, reader.take([ids[p] for p in posicoes])):
+            yield posicao, dados
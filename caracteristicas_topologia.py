@@ -0,0 +1,101 @@
+"""
+Características de uma topologia que não dependem da amostra (grau dos nós,
+distâncias em saltos, excentricidade e intermediação), calculadas uma única
+vez por grafo e compartilhadas por todas as chamadas dos solvers.
+
+O cache é indexado pelo conteúdo do grafo (nós e arestas), então grafos
+iguais lidos de novo pelo DatanetAPI reaproveitam as mesmas características.
+
+Uso:
+    feats = caracteristicas_de(dados)   # Sample, grafo networkx ou feats
+    graus = feats.grau                  # mesmo conteúdo de dict(nx.degree(G))
+"""
+import hashlib
+import weakref
+from functools import cached_property
+import networkx as nx
+import numpy as np
+
+# Características por hash do conteúdo do grafo
+_por_conteudo = {}
+# Atalho por objeto grafo, para não recalcular o hash a cada chamada
+_por_grafo = weakref.WeakKeyDictionary()
+
+
+class CaracteristicasTopologia:
+    """
+    Características de um grafo, calculadas na primeira vez que são usadas.
+
+    Atributos:
+        grafo: Grafo networkx da topologia
+        ordem_nos (list): Nós na ordem do grafo
+        grau (dict): Grau de cada nó, na ordem do grafo (nx.degree)
+        grau_vetor (ndarray): Grau do nó de índice i da ordem_nos
+        distancias_saltos (ndarray): Matriz (N, N) com o número de saltos do
+            caminho mais curto de i a j (inf se não houver caminho)
+        excentricidade (ndarray): Maior distância em saltos de cada nó
+        intermediacao (ndarray): Betweenness centrality de cada nó
+    """
+
+    def __init__(self, grafo):
+        self.grafo = grafo
+        self.ordem_nos = list(grafo.nodes())
+        self._indice = {no: i for i, no in enumerate(self.ordem_nos)}
+
+    @cached_property
+    def grau(self):
+        return dict(nx.degree(self.grafo))
+
+    @cached_property
+    def grau_vetor(self):
+        return np.array([self.grau[no] for no in self.ordem_nos])
+
+    @cached_property
+    def distancias_saltos(self):
+        n_nodes = len(self.ordem_nos)
+        distancias = np.full((n_nodes, n_nodes), np.inf)
+        for origem, alcancados in nx.all_pairs_shortest_path_length(self.grafo):
+            i = self._indice[origem]
+            for destino, saltos in alcancados.items():
+                distancias[i, self._indice[destino]] = saltos
+        return distancias
+
+    @cached_property
+    def excentricidade(self):
+        return self.distancias_saltos.max(axis=1)
+
+    @cached_property
+    def intermediacao(self):
+        centralidade = nx.betweenness_centrality(self.grafo)
+        return np.array([centralidade[no] for no in self.ordem_nos])
+
+
+def hash_grafo(grafo):
+    """
+    Retorna o hash do conteúdo do grafo: seus nós e arestas, na ordem do grafo.
+    """
+    conteudo = repr((list(grafo.nodes()), list(grafo.edges())))
+    return hashlib.sha1(conteudo.encode()).hexdigest()
+
+
+def caracteristicas_de(dados):
+    """
+    Retorna as CaracteristicasTopologia compartilhadas da topologia de dados.
+
+    Args:
+        dados: Sample do DatanetAPI, grafo networkx ou CaracteristicasTopologia
+
+    Returns:
+        CaracteristicasTopologia
+    """
+    if isinstance(dados, CaracteristicasTopologia):
+        return dados
+    grafo = dados if isinstance(dados, nx.Graph) else dados.get_topology_object()
+    feats = _por_grafo.get(grafo)
+    if feats is None:
+        chave = hash_grafo(grafo)
+        feats = _por_conteudo.get(chave)
+        if feats is None:
+            feats = _por_conteudo[chave] = CaracteristicasTopologia(grafo)
+        _por_grafo[grafo] = feats
+    return feats
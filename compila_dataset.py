@@ -0,0 +1,106 @@
+"""
+Compila as amostras de uma topologia em tensores (amostras, N, N) de AvgDelay e
+AvgBw gravados em disco, para serem abertos via memory-map pelos experimentos
+sem reler os arquivos tar.gz.
+
+Uso:
+    python compila_dataset.py ./nsfnetbw/ ./geant2bw/ ./synth50bw/
+"""
+import sys, os
+import json
+import itertools
+import numpy as np
+import datanetAPI
+
+DIRETORIO_TENSORES = './tensores'
+ARQUIVO_INDICE = 'index.json'
+ARQUIVO_LATENCIAS = 'AvgDelay.f32'
+ARQUIVO_CAPACIDADES = 'AvgBw.f32'
+
+
+def nome_topologia(topology_path):
+    return os.path.basename(os.path.normpath(topology_path))
+
+
+def compila_topologia(topology_path, destino=None, max_amostras=None, seed=42):
+    """
+    Percorre a topologia com o DatanetAPI e grava um arquivo float32 contíguo
+    para AvgDelay e outro para AvgBw, ambos com forma (amostras, N, N), além
+    de um índice JSON com o arquivo tar, a linha e o maxAvgLambda de cada
+    amostra.
+
+    Args:
+        topology_path (str): Pasta da topologia (ex: './nsfnetbw/')
+        destino (str): Pasta de saída (padrão: ./tensores/<topologia>/)
+        max_amostras (int): Número máximo de amostras compiladas (padrão: todas)
+        seed (int): Seed da ordem dos arquivos tar (parâmetro seed do DatanetAPI)
+
+    Returns:
+        str: Pasta onde os tensores foram gravados
+    """
+    if destino is None:
+        destino = os.path.join(DIRETORIO_TENSORES, nome_topologia(topology_path))
+    os.makedirs(destino, exist_ok=True)
+
+    amostras = []
+    n_nodes = None
+    caminho_lat = os.path.join(destino, ARQUIVO_LATENCIAS)
+    caminho_cap = os.path.join(destino, ARQUIVO_CAPACIDADES)
+    # Os tensores são escritos amostra a amostra, sem manter as amostras em memória
+    with datanetAPI.DatanetAPI(topology_path, [], decode="columnar", detail="aggregate", seed=seed) as reader, \
+            open(caminho_lat + '.tmp', 'wb') as f_lat, open(caminho_cap + '.tmp', 'wb') as f_cap:
+        # islice para antes de pedir a amostra seguinte, sem ler outro tar
+        for k, dados in enumerate(itertools.islice(reader, max_amostras)):
+            lat = dados.get_aggregate_matrix("AvgDelay")
+            if n_nodes is None:
+                n_nodes = len(lat)
+            lat.astype(np.float32).tofile(f_lat)
+            dados.get_aggregate_matrix("AvgBw").astype(np.float32).tofile(f_cap)
+            amostras.append({
+                "id": k,
+                "arquivo": os.path.relpath(dados._get_data_set_file_name(), topology_path),
+                "linha": dados._get_data_set_line(),
+                "maxAvgLambda": float(dados.get_maxAvgLambda())
+            })
+    os.replace(caminho_lat + '.tmp', caminho_lat)
+    os.replace(caminho_cap + '.tmp', caminho_cap)
+
+    indice = {
+        "topologia": nome_topologia(topology_path),
+        "shape": [len(amostras), n_nodes or 0, n_nodes or 0],
+        "dtype": "float32",
+        "seed": seed,
+        "amostras": amostras
+    }
+    with open(os.path.join(destino, ARQUIVO_INDICE), 'w') as f:
+        json.dump(indice, f, indent=1)
+    return destino
+
+
+def abre_topologia(destino):
+    """
+    Abre via memory-map os tensores gravados por compila_topologia. Indexar a
+    amostra k (lat[k]) não copia dados.
+
+    Returns:
+        tuple: (latencias, capacidades, indice), com latencias e capacidades
+        somente leitura com forma (amostras, N, N)
+    """
+    with open(os.path.join(destino, ARQUIVO_INDICE)) as f:
+        indice = json.load(f)
+    shape = tuple(indice["shape"])
+    if shape[0] == 0:
+        vazio = np.empty(shape, dtype=indice["dtype"])
+        return vazio, vazio, indice
+    latencias = np.memmap(os.path.join(destino, ARQUIVO_LATENCIAS), dtype=indice["dtype"], mode='r', shape=shape)
+    capacidades = np.memmap(os.path.join(destino, ARQUIVO_CAPACIDADES), dtype=indice["dtype"], mode='r', shape=shape)
+    return latencias, capacidades, indice
+
+
+if __name__ == "__main__":
+    topologias = sys.argv[1:] or ['./nsfnetbw/', './geant2bw/', './synth50bw/']
+    for topology_path in topologias:
+        print(f"Compilando {topology_path}...")
+        destino = compila_topologia(topology_path)
+        _, _, indice = abre_topologia(destino)
+        print(f"  {indice['shape'][0]} amostras de {indice['shape'][1]} nós gravadas em {destino}")
@@ -1,240 +1,3 @@
-<<<<<<< Updated upstream
-"""
-DatanetAPI module for reading network dataset files.
-"""
-import queue
-import numpy
-import networkx
-import tarfile
-import random
-import math
-import os
-
-
-class TimeDist:
-    EXPONENTIAL_T = "exponential"
-
-
-class SizeDist:
-    BINOMIAL_S = "binomial"
-
-
-class Sample:
-    def __init__(self):
-        self._dataset_file_name = None
-        self._results_line = None
-        self._flowresults_line = None
-        self._routing_matrix = None
-        self._topology_object = None
-        self._performance_matrix = None
-        self._traffic_matrix = None
-        self._global_packets = None
-        self._global_losses = None
-        self._global_delay = None
-        self.maxAvgLambda = None
-
-    def _set_data_set_file_name(self, name):
-        self._dataset_file_name = name
-    
-    def _set_routing_matrix(self, matrix):
-        self._routing_matrix = matrix
-    
-    def _set_topology_object(self, obj):
-        self._topology_object = obj
-    
-    def _set_performance_matrix(self, matrix):
-        self._performance_matrix = matrix
-    
-    def _set_traffic_matrix(self, matrix):
-        self._traffic_matrix = matrix
-    
-    def _set_global_packets(self, packets):
-        self._global_packets = packets
-    
-    def _set_global_losses(self, losses):
-        self._global_losses = losses
-    
-    def _set_global_delay(self, delay):
-        self._global_delay = delay
-
-    def get_performance_matrix(self):
-        return self._performance_matrix
-    
-    def get_traffic_matrix(self):
-        return self._traffic_matrix
-    
-    @property
-    def topology_object(self):
-        return self._topology_object
-
-
-class DatanetAPI:
-    """
-    Class containing all the functionalities to read the dataset line by line
-    by means of an iteratos, and generate a Sample instance with the
-    information gathered.
-    """
-
-    def __init__(self, data_folder, intensity_values=None):
-        """
-        Initialization of the PasringTool instance
-
-        Parameters
-        ----------
-        data_folder : str
-            Folder where the dataset is stored.
-        dict_queue : Queue
-            Auxiliar data structures used to conveniently move information
-            between the file where they are read, and the matrix where they
-            are located.
-        intensity_values : int or array [x, y]
-            User-defined intensity values used to constrain the reading process
-            to these/this value/range of values.
-
-        Returns
-        -------
-        None.
-
-        """
-
-        if intensity_values is None:
-            intensity_values = []
-        self.data_folder = data_folder
-        self.dict_queue = queue.Queue()
-        self.intensity_values = intensity_values
-
-    def _readRoutingFile(self, routing_fd, netSize):
-        """
-        Pending to compare against getSrcPortDst
-
-        Parameters
-        ----------
-        routing_file : str
-            File where the routing information is located.
-        netSize : int
-            Number of nodes in the network.
-
-        Returns
-        -------
-        R : netSize x netSize matrix
-            Matrix where each  [i,j] states what port node i should use to
-            reach node j.
-
-        """
-
-        R = numpy.zeros((netSize, netSize)) - 1
-        src = 0
-        for line in routing_fd:
-            line = line.decode()
-            camps = line.split(',')
-            dst = 0
-            for port in camps[:-1]:
-                R[src][dst] = port
-                dst += 1
-            src += 1
-        return (R)
-
-    def _getRoutingSrcPortDst(self, G):
-        """
-        Return a dictionary of dictionaries with the format:
-        node_port_dst[node][port] = next_node
-
-        Parameters
-        ----------
-        G : TYPE
-            DESCRIPTION.
-
-        Returns
-        -------
-        None.
-
-        """
-
-        node_port_dst = {}
-        for node in G:
-            port_dst = {}
-            node_port_dst[node] = port_dst
-            for destination in G[node].keys():
-                port = G[node][destination][0]['port']
-                node_port_dst[node][port] = destination
-        return node_port_dst
-
-    def _create_routing_matrix(self, G, routing_file):
-        """
-
-        Parameters
-        ----------
-        G : graph
-            Graph representing the network.
-        routing_file : str
-            File where the information about routing is located.
-
-        Returns
-        -------
-        MatrixPath : NxN Matrix
-            Matrix where each cell [i,j] contains the path to go from node
-            i to node j.
-
-        """
-
-        netSize = G.number_of_nodes()
-        node_port_dst = self._getRoutingSrcPortDst(G)
-        R = self._readRoutingFile(routing_file, netSize)
-        MatrixPath = numpy.empty((netSize, netSize), dtype=object)
-        for src in range(0, netSize):
-            for dst in range(0, netSize):
-                node = src
-                path = [node]
-                while R[node][dst] != -1:
-                    out_port = R[node][dst]
-                    next_node = node_port_dst[node][out_port]
-                    path.append(next_node)
-                    node = next_node
-                MatrixPath[src][dst] = path
-        return MatrixPath
-
-    def _get_graph_for_tarfile(self, tar):
-        """
-    
-
-        Parameters
-        ----------
-        tar : str
-            tar file where the graph file is located.
-
-        Returns
-        -------
-        ret : graph
-            Graph representation of the network.
-
-        """
-
-        for member in tar.getmembers():
-            if 'graph' in member.name:
-                f = tar.extractfile(member)
-                ret = networkx.read_gml(f, destringizer=int)
-                return ret
-
-    def _check_intensity(self, file):
-        """
-    
-
-        Parameters
-        ----------
-        file : str
-            Name of the data file that needs to be filtered by intensity.
-
-        Returns
-        -------
-        2 if the range of intensities treates in the file satisfies the needs
-        of the user.
-        1 if there may be lines in the file that do not fulfill the user
-        requirements.
-        0 if the file does not fulfill the user-defined intensity requirements.
-
-        """
-
-=======
 '''
  *
  * Copyright (C) 2020 Universitat Politècnica de Catalunya.
@@ -255,8 +18,10 @@ class DatanetAPI:
 
 # -*- coding: utf-8 -*-
 
-import os, tarfile, numpy, math, networkx, queue, random, traceback, re
+import os, io, tarfile, numpy, math, networkx, queue, random, traceback, re, collections, functools, hashlib, gzip, json, bisect, weakref, numbers
+from concurrent.futures import ProcessPoolExecutor
 from enum import IntEnum
+from datanet_cache import SampleCache
 
 
 class TimeDist(IntEnum):
@@ -311,6 +76,16 @@ class SizeDist(IntEnum):
             return "UNKNOWN"
 
 
+# Layout of the aggregated fields of a simulationResults.txt line. Each line
+# holds first a block of N*N*3 traffic fields and then a block of N*N*7 delay
+# fields, both ordered by (src, dst).
+TRAFFIC_FIELDS = ('AvgBw', 'PktsGen', 'PktsDrop')
+DELAY_FIELDS = ('AvgDelay', 'p10', 'p20', 'p50', 'p80', 'p90', 'Jitter')
+AGGREGATE_KEYS = DELAY_FIELDS + TRAFFIC_FIELDS
+# Aggregate matrices kept by the columnar decoder with cache_full=False
+LATCAP_KEYS = ('AvgDelay', 'AvgBw')
+
+
 class Sample:
     """
     Class used to contain the results of a single iteration in the dataset
@@ -337,11 +112,16 @@ class Sample:
         Matrix where each cell [i,j] contains aggregated and flow-level
         information about size and time distributions between source i and
         destination j.
-    routing_matrix : NxN matrix
+    routing_matrix : RoutingMatrix
         Matrix where each cell [i,j] contains the path, if it exists, between
         source i and destination j.
     topology_object : 
         Network topology using networkx format.
+    aggregate_matrices : dict
+        Only filled when the dataset is read with decode="columnar". Maps each
+        key of AGGREGATE_KEYS to a dense NxN float array holding the same
+        values as the 'AggInfo' dictionaries of the performance and traffic
+        matrices.
     """
 
     global_packets = None
@@ -353,6 +133,7 @@ class Sample:
     traffic_matrix = None
     routing_matrix = None
     topology_object = None
+    aggregate_matrices = None
 
     _results_line = None
     _flowresults_line = None
@@ -442,6 +223,33 @@ class Sample:
 
         return self.traffic_matrix[src, dst]
 
+    def get_aggregate_matrices(self):
+        """
+        Returns the dictionary of dense aggregate matrices of this Sample
+        instance (None if the sample was not decoded in columnar mode).
+        """
+
+        return self.aggregate_matrices
+
+    def get_aggregate_matrix(self, key):
+        """
+        
+
+        Parameters
+        ----------
+        key : str
+            One of AGGREGATE_KEYS, e.g. 'AvgDelay' or 'AvgBw'.
+
+        Returns
+        -------
+        NxN array
+            Dense matrix where each cell [i,j] holds the aggregated value of
+            the requested field between source i and destination j.
+
+        """
+
+        return self.aggregate_matrices[key]
+
     def get_routing_matrix(self):
         """
         Returns the routing_matrix of this Sample instance.
@@ -556,6 +364,12 @@ class Sample:
         """
         self.data_set_file = file
 
+    def _set_data_set_line(self, line):
+        """
+        Sets the index of the line of the results file the sample comes from.
+        """
+        self.data_set_line = line
+
     def _set_performance_matrix(self, m):
         """
         Sets the performance_matrix of this Sample instance.
@@ -577,6 +391,13 @@ class Sample:
 
         self.routing_matrix = m
 
+    def _set_aggregate_matrices(self, m):
+        """
+        Sets the aggregate_matrices of this Sample instance.
+        """
+
+        self.aggregate_matrices = m
+
     def _set_topology_object(self, G):
         """
         Sets the topology_object of this Sample instance.
@@ -611,6 +432,12 @@ class Sample:
         """
         return self.data_set_file
 
+    def _get_data_set_line(self):
+        """
+        Gets the index of the line of the results file the sample comes from.
+        """
+        return self.data_set_line
+
     def _get_path_for_srcdst(self, src, dst):
         """
         Returns the path between node src and node dst.
@@ -681,6 +508,167 @@ class Sample:
         return self.traffic_matrix[src, dst]
 
 
+def _lazy_attribute(name):
+    """
+    Property of LazySample that decodes the sample on first access.
+    """
+
+    def fget(self):
+        if self._raw is not None:
+            self._decode()
+        return self._decoded.get(name)
+
+    def fset(self, value):
+        self._decoded[name] = value
+
+    return property(fget, fset)
+
+
+class LazySample(Sample):
+    """
+    Sample yielded by DatanetAPI(..., lazy=True). Only the raw lines of the
+    results files are kept when it is created: the line is decoded, with the
+    decoder of the reader, on the first access to a performance, traffic or
+    aggregate matrix or to a global statistic, and the decoded values are
+    kept afterwards. Routing and topology are shared objects, set as in
+    Sample, so reading them decodes nothing.
+    """
+
+    performance_matrix = _lazy_attribute('performance_matrix')
+    traffic_matrix = _lazy_attribute('traffic_matrix')
+    aggregate_matrices = _lazy_attribute('aggregate_matrices')
+    global_packets = _lazy_attribute('global_packets')
+    global_losses = _lazy_attribute('global_losses')
+    global_delay = _lazy_attribute('global_delay')
+    _results_line = _lazy_attribute('_results_line')
+    _flowresults_line = _lazy_attribute('_flowresults_line')
+
+    def __init__(self, reader, rline, fline, simParameters):
+        """
+        
+
+        Parameters
+        ----------
+        reader : DatanetAPI
+            Reader whose decode mode is used to decode the lines.
+        rline, fline : bytes
+            Raw lines of the results and flows files (fline may be None).
+        simParameters : dict
+            Parameters read from params.ini.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self._reader = reader
+        self._raw = (rline, fline)
+        self._simParameters = simParameters
+        self._decoded = {}
+        self.maxAvgLambda = simParameters["avgLambdaMax"]
+
+    def _decode(self):
+        """
+        Decodes the raw lines, filling all the matrices and statistics at once.
+        """
+
+        rline, fline = self._raw
+        self._raw = None
+        try:
+            self._reader._decode_sample(self, rline, fline, self._simParameters)
+        except BaseException:
+            self._raw = (rline, fline)
+            raise
+
+    def __getstate__(self):
+        # The reader holds a queue, which cannot be pickled. Samples created
+        # in a worker process get the reader of the main process attached.
+        state = self.__dict__.copy()
+        state['_reader'] = None
+        return state
+
+
+class RoutingMatrix:
+    """
+    Compact representation of the routing of a network: an int32 next-hop
+    matrix from which the paths are expanded on demand.
+
+    Indexing it as the former matrix of paths is still supported:
+    routing_matrix[src, dst] and routing_matrix[src][dst] return the list of
+    nodes of the path from src to dst.
+
+    ...
+
+    Attributes
+    ----------
+    next_hop : NxN int32 array
+        Cell [i,j] holds the node that follows i in the path from i to j, or
+        -1 if there is no next hop (i == j or no route).
+    hop_count : NxN int32 array
+        Number of links of the path from i to j.
+    path_length : NxN int32 array
+        Number of nodes of the path from i to j, i.e. len(routing_matrix[i, j]).
+    """
+
+    def __init__(self, next_hop):
+        netSize = len(next_hop)
+        self.next_hop = numpy.asarray(next_hop, dtype=numpy.int32)
+        self.shape = (netSize, netSize)
+
+        # All the paths are followed at once, one hop per step
+        dst = numpy.broadcast_to(numpy.arange(netSize), self.shape)
+        node = numpy.broadcast_to(numpy.arange(netSize)[:, None], self.shape).copy()
+        hop_count = numpy.zeros(self.shape, dtype=numpy.int32)
+        active = self.next_hop[node, dst] != -1
+        while active.any():
+            if hop_count.max() >= netSize:
+                raise ValueError('The routing contains loops')
+            node[active] = self.next_hop[node[active], dst[active]]
+            hop_count[active] += 1
+            active = self.next_hop[node, dst] != -1
+        self.hop_count = hop_count
+        self.path_length = hop_count + 1
+        for array in (self.next_hop, self.hop_count, self.path_length):
+            array.setflags(write=False)
+
+    def get_path(self, src, dst):
+        """
+        Returns the list of nodes of the path from src to dst.
+        """
+
+        path = [src]
+        node = src
+        while self.next_hop[node, dst] != -1:
+            node = int(self.next_hop[node, dst])
+            path.append(node)
+        return path
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self.get_path(int(key[0]), int(key[1]))
+        return [self.get_path(int(key), dst) for dst in range(self.shape[1])]
+
+    def __len__(self):
+        return self.shape[0]
+
+
+def _is_integer(value):
+    # Python and numpy integers, but not bool
+    return isinstance(value, numbers.Integral) and not isinstance(value, (bool, numpy.bool_))
+
+
+# RoutingMatrix instances shared by all the tar files and DatanetAPI instances
+# with the same routing, keyed by routing content and graph port numbering.
+_routing_cache = collections.OrderedDict()
+_ROUTING_CACHE_SIZE = 128
+
+# Format of the persisted line-offset index, bumped when its content changes
+INDEX_VERSION = 2
+# Format of the sample cache entries, part of their keys
+CACHE_VERSION = 2
+
+
 class DatanetAPI:
     """
     Class containing all the functionalities to read the dataset line by line
@@ -688,7 +676,9 @@ class DatanetAPI:
     information gathered.
     """
 
-    def __init__(self, data_folder, intensity_values=None):
+    def __init__(self, data_folder, intensity_values=None, decode="dict", detail="full",
+                 cache_dir=None, cache_max_bytes=2 * 1024 ** 3, cache_full=True, workers=None, seed=None,
+                 filter_lines=False, lazy=False, max_open_archives=8):
         """
         Initialization of the PasringTool instance
 
@@ -703,6 +693,58 @@ class DatanetAPI:
         intensity_values : int or array [x, y]
             User-defined intensity values used to constrain the reading process
             to these/this value/range of values.
+        decode : str
+            "dict" (default) builds the performance and traffic matrices of
+            dictionaries. "columnar" parses every line straight into dense
+            float arrays, exposed through Sample.get_aggregate_matrix, and
+            leaves the dictionary matrices unset.
+        detail : str
+            "full" (default) decodes the aggregated and the flow-level
+            information. "aggregate" only decodes the 'AggInfo' of each
+            src-dst pair: the 'Flows' lists are not built and the
+            flowSimulationResults.txt file is never opened.
+        cache_dir : str
+            If given, decoded samples are stored in this directory (see
+            datanet_cache.SampleCache) and later iterations load them from it
+            instead of decompressing the tar files. Only used when no
+            flow-level information is decoded.
+        cache_max_bytes : int
+            Size limit of the cache directory. Least recently used entries
+            are evicted beyond it.
+        cache_full : bool
+            If True (default) all the aggregated fields of the line are
+            cached. If False, in "columnar" decode mode, samples only expose
+            the AvgDelay and AvgBw matrices (LATCAP_KEYS) and the global
+            statistics, whether they are decoded from the tar files or loaded
+            from the cache, and only those are cached. Always True in "dict"
+            decode mode, which needs all the fields to rebuild the
+            dictionaries.
+        workers : int
+            If greater than 1, tar files are decompressed and parsed in a pool
+            of this many processes. Samples are still yielded in the same
+            order as the single-process reader. Scripts using it must guard
+            their entry point with if __name__ == "__main__" on platforms
+            that spawn the worker processes.
+        seed : int
+            If given, the tar files of each folder are visited in an order
+            that only depends on this seed (sorted names shuffled with
+            random.Random(seed)) instead of the global random state. It also
+            identifies the line-offset index used by reader[k] and take().
+        filter_lines : bool
+            Only used with a range of intensity_values. The tar files whose
+            name range partially overlaps it may hold lines out of range:
+            if True, those lines are skipped without being decoded, using the
+            per-line intensity stored in the line-offset index (built on first
+            use). See _line_intensities.
+        lazy : bool
+            If True, samples are yielded as LazySample objects, which only
+            decode their line on first access to its matrices or global
+            statistics. Samples read from the cache are already decoded, and
+            lines read while filling the cache are decoded to store them.
+        max_open_archives : int
+            Number of tar files kept open between calls to reader[k] and
+            take(), least recently used first closed. Iteration keeps a
+            single tar file open per iterator.
 
         Returns
         -------
@@ -712,11 +754,62 @@ class DatanetAPI:
 
         if intensity_values is None:
             intensity_values = []
+        if decode not in ("dict", "columnar"):
+            raise ValueError('decode must be "dict" or "columnar", got {!r}'.format(decode))
+        if detail not in ("full", "aggregate"):
+            raise ValueError('detail must be "full" or "aggregate", got {!r}'.format(detail))
         self.data_folder = data_folder
         self.dict_queue = queue.Queue()
         self.intensity_values = intensity_values
+        self.decode = decode
+        self.detail = detail
+        self.cache = None
+        if cache_dir is not None and not self._needs_flows():
+            self.cache = SampleCache(cache_dir, cache_max_bytes)
+        self.cache_full = cache_full or decode == "dict"
+        self.workers = workers
+        self.seed = seed
+        self.filter_lines = filter_lines
+        self.lazy = lazy
+        self.max_open_archives = max_open_archives
+        self._archives = collections.OrderedDict()
+        self._iterators = weakref.WeakSet()
+        self._index = None
+        self._graphs = {}
 
-    def _readRoutingFile(self, routing_fd, netSize):
+    def _cache_mode(self):
+        """
+        Returns the parse mode string that takes part in the cache keys.
+        """
+
+        return "{}-{}-{}-v{}".format(self.decode, self.detail, "full" if self.cache_full else "latcap",
+                                     CACHE_VERSION)
+
+    def _needs_flows(self):
+        """
+        Returns True if the chosen parse mode decodes flow-level information.
+        """
+
+        return self.decode == "dict" and self.detail == "full"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def close(self):
+        """
+        Stops the iterators still alive and closes all the files they and
+        random access keep open. The reader can still be used afterwards.
+        """
+
+        for it in list(self._iterators):
+            it.close()
+        while self._archives:
+            self._close_archive(self._archives.popitem(last=False)[1])
+
+    def _readRoutingFile(self, routing_fd, netSize):
         """
         Pending to compare against getSrcPortDst
 
@@ -790,20 +883,52 @@ class DatanetAPI:
 
         """
 
+        R = self._readRoutingFile(routing_file, G.number_of_nodes())
+        return self._routing_matrix_from_ports(G, R)
+
+    def _routing_matrix_from_ports(self, G, R):
+        """
+
+        Parameters
+        ----------
+        G : graph
+            Graph representing the network.
+        R : netSize x netSize matrix
+            Output ports read by _readRoutingFile.
+
+        Returns
+        -------
+        MatrixPath : RoutingMatrix
+            Matrix where each cell [i,j] contains the path to go from node
+            i to node j. Shared by every call with the same routing and graph.
+
+        """
+
         netSize = G.number_of_nodes()
         node_port_dst = self._getRoutingSrcPortDst(G)
-        R = self._readRoutingFile(routing_file, netSize)
-        MatrixPath = numpy.empty((netSize, netSize), dtype=object)
-        for src in range(0, netSize):
-            for dst in range(0, netSize):
-                node = src
-                path = [node]
-                while R[node][dst] != -1:
-                    out_port = R[node][dst]
-                    next_node = node_port_dst[node][out_port]
-                    path.append(next_node)
-                    node = next_node
-                MatrixPath[src][dst] = path
+        R = numpy.asarray(R)
+        key = hashlib.sha1(R.astype(numpy.int64).tobytes()
+                           + repr(sorted((node, sorted(ports.items())) for node, ports in node_port_dst.items()))
+                           .encode()).hexdigest()
+        MatrixPath = _routing_cache.get(key)
+        if MatrixPath is not None:
+            _routing_cache.move_to_end(key)
+            return MatrixPath
+
+        # port_dst[node, port] = node reached through that port
+        max_port = max((port for ports in node_port_dst.values() for port in ports), default=0)
+        port_dst = numpy.full((netSize, int(max_port) + 1), -1, dtype=numpy.int32)
+        for node, ports in node_port_dst.items():
+            for port, next_node in ports.items():
+                port_dst[node, int(port)] = next_node
+        ports = R.astype(numpy.int64)
+        src = numpy.arange(netSize)[:, None]
+        next_hop = numpy.where(ports == -1, -1, port_dst[src, numpy.maximum(ports, 0)])
+        MatrixPath = RoutingMatrix(next_hop)
+
+        _routing_cache[key] = MatrixPath
+        if len(_routing_cache) > _ROUTING_CACHE_SIZE:
+            _routing_cache.popitem(last=False)
         return MatrixPath
 
     def _get_graph_for_tarfile(self, tar):
@@ -847,7 +972,6 @@ class DatanetAPI:
 
         """
 
->>>>>>> Stashed changes
         aux = file.split('_')
         aux = aux[2]
         aux = aux.split('-')
@@ -902,8 +1026,7 @@ class DatanetAPI:
 
     def __iter__(self):
         """
-<<<<<<< Updated upstream
-    
+        
 
         Yields
         ------
@@ -913,21 +1036,93 @@ class DatanetAPI:
 
         """
 
-        g = None
+        it = self._iter_topologies(self._walk_topologies())
+        self._iterators.add(it)
+        return it
+
+    def topology_iterators(self):
+        """
+        Returns one iterator of samples per topology folder, in the order of
+        an iteration of the reader. The order of the tar files is drawn
+        (from the seed or the global random state) by this call, while the
+        samples are only read as the iterators are consumed, possibly in
+        another thread.
+
+        Returns
+        -------
+        list of iterator
+            Iterators of Sample, one per folder holding a graph_attr.txt
+            file. Closing one releases its open tar file.
+
+        """
+
+        iterators = [self._iter_topologies([topology]) for topology in self._walk_topologies()]
+        for it in iterators:
+            self._iterators.add(it)
+        return iterators
+
+    def _iter_topologies(self, topologies):
+        """
+        Yields the samples of the (root, g, tar_paths) tuples of
+        _walk_topologies, which may have been listed beforehand to fix the
+        order of the tar files.
+        """
+
+        for root, g, tar_paths in topologies:
+            if self.workers is not None and self.workers > 1:
+                yield from self._iter_tar_files_parallel(tar_paths, g)
+                continue
+            for tar_path in tar_paths:
+                keep = self._lines_to_keep(tar_path)
+                cached = self._iter_cached_tar_file(tar_path, g, keep) if self.cache else None
+                if cached is not None:
+                    yield from cached
+                else:
+                    yield from self._iter_tar_file(tar_path, g, keep)
+
+    def _walk_topologies(self, global_random=True):
+        """
+        
+
+        Parameters
+        ----------
+        global_random : bool
+            Only used when the reader has no seed: if True the tar files are
+            shuffled with the global random state, otherwise they are sorted.
+
+        Yields
+        ------
+        root : str
+            Folder holding a graph_attr.txt file.
+        g : graph
+            Graph read from that folder.
+        tar_paths : list
+            Tar files of the folder that fulfill the intensity requirements,
+            in the order they are read.
+
+        """
+
         graph_file = False
         s_dirs = []
         for root, dirs, files in os.walk(self.data_folder):
             if "graph_attr.txt" in files:
-                g = networkx.read_gml(os.path.join(root, "graph_attr.txt"), destringizer=int)
+                g = self._get_graph_for_folder(root)
                 graph_file = True
             else:
                 s_dir = root.replace(self.data_folder, '')
                 if s_dir != '':
                     s_dirs.append(root.replace(self.data_folder, ''))
                 continue
-            self.__process_graph(g)
             tar_files = [f for f in files if f.endswith("tar.gz")]
-            random.shuffle(tar_files)
+            if self.seed is None:
+                if global_random:
+                    random.shuffle(tar_files)
+                else:
+                    tar_files.sort()
+            else:
+                tar_files.sort()
+                random.Random(self.seed).shuffle(tar_files)
+            tar_paths = []
             for file in tar_files:
                 if len(self.intensity_values) == 0:
                     feasibility_of_file = 2
@@ -935,244 +1130,815 @@ class DatanetAPI:
                     feasibility_of_file = self._check_intensity(file)
 
                 if feasibility_of_file != 0:
-                    tar = tarfile.open(os.path.join(root, file), 'r:gz')
-                    dir_info = tar.next()
-                    routing_file = tar.extractfile(dir_info.name + "/Routing.txt")
-                    results_file = tar.extractfile(dir_info.name + "/simulationResults.txt")
-                    if dir_info.name + "/flowSimulationResults.txt" in tar.getnames():
-                        flowresults_file = tar.extractfile(dir_info.name + "/flowSimulationResults.txt")
-                    else:
-                        flowresults_file = None
-                    params_file = tar.extractfile(dir_info.name + "/params.ini")
-                    simParameters = self.__process_params_file(params_file)
-
-                    routing_matrix = self._create_routing_matrix(g, routing_file)
-                    while True:
-                        s = Sample()
-                        s._set_data_set_file_name(os.path.join(root, file))
-
-                        s._results_line = results_file.readline().decode()[:-2]
-                        if flowresults_file:
-                            s._flowresults_line = flowresults_file.readline().decode()[:-2]
-                        else:
-                            s._flowresults_line = None
-
-                        if len(s._results_line) == 0:
-                            break
-
-                        self._process_flow_results_traffic_line(s._results_line, s._flowresults_line, simParameters, s)
-                        s._set_routing_matrix(routing_matrix)
-                        s._set_topology_object(g)
-                        yield s
+                    tar_paths.append(os.path.join(root, file))
+            yield root, g, tar_paths
         if not graph_file:
             print('ERROR: The API was not able to find the graph information file in any of the following dirs {}.'
-                    .format(s_dirs))
+                  .format(s_dirs))
 
-    def _process_flow_results_traffic_line(self, rline, fline, simParameters, s):
+    def _get_graph_for_folder(self, root):
         """
-    
+        Reads the graph_attr.txt file of a folder. Iterating the dataset reads
+        a fresh graph every time, random access reuses it.
+        """
+
+        g = networkx.read_gml(os.path.join(root, "graph_attr.txt"), destringizer=int)
+        self.__process_graph(g)
+        self._graphs[root] = g
+        return g
+
+    def _open_tar_file(self, tar_path, netSize):
+        """
+        Opens a tar file and reads its small members.
 
         Parameters
         ----------
-        rline : str
-            Last line read in the results file.
-        fline : str
-            Last line read in the flows file.
-        s : Sample
-            Instance of Sample associated with the current iteration.
+        tar_path : str
+            Path of the tar file.
+        netSize : int
+            Number of nodes in the network.
 
         Returns
         -------
-        None.
+        tar : TarFile
+            The open tar file, to be closed by the caller once the results
+            files have been read.
+        results_file, flowresults_file : file objects
+            Results files of the tar file (flowresults_file is None if it is
+            missing or the parse mode does not need it).
+        simParameters : dict
+            Parameters read from params.ini.
+        R : netSize x netSize matrix
+            Output ports read from Routing.txt.
 
         """
 
-        sim_time = simParameters["simulationTime"]
-        r = rline.split(',')
-        if fline:
-            f = fline.split(',')
-        else:
-            f = r
+        tar = tarfile.open(tar_path, 'r:gz')
+        try:
+            members = self._scan_tar_members(tar)
+            if "flowSimulationResults.txt" not in members:
+                members["flowSimulationResults.txt"] = None
+            simParameters = self.__process_params_file(members["params.ini"])
+            R = self._readRoutingFile(members["Routing.txt"], netSize)
+        except BaseException:
+            tar.close()
+            raise
+        return tar, members["simulationResults.txt"], members["flowSimulationResults.txt"], simParameters, R
 
-        s.maxAvgLambda = simParameters["avgLambdaMax"]
+    def _scan_tar_members(self, tar):
+        """
+        Finds the members of a tar file needed by the parse mode reading its
+        headers once, in archive order, without listing the whole archive:
+        the scan stops at the last needed member. The members found before it
+        are read into memory as they are passed, so that the gzip stream is
+        never rewound. The last one is returned as a stream positioned at its
+        data.
 
-        m_result = []
-        m_traffic = []
-        netSize = int(math.sqrt(len(r) / 10))
-        numFlows = int(len(f) / (netSize * netSize * 10))
-        globalPackets = 0
-        globalLosses = 0
-        globalDelay = 0
-        offset = netSize * netSize * 3
-        for src_node in range(netSize):
-            new_result_row = []
-            new_traffic_row = []
-            for dst_node in range(netSize):
-                offset_t = (src_node * netSize + dst_node) * 3
-                offset_d = offset + (src_node * netSize + dst_node) * 7
-                pcktsGen = float(r[offset_t + 1])
-                pcktsDrop = float(r[offset_t + 2])
-                pcktsDelay = float(r[offset_d])
+        Parameters
+        ----------
+        tar : TarFile
+            Tar file just opened.
 
-                dict_result_srcdst = {}
-                dict_result_agg = {
-                    'PktsDrop': numpy.round(pcktsDrop / sim_time, 6),
-                    "AvgDelay": pcktsDelay,
-                    "p10": float(r[offset_d + 1]),
-                    "p20": float(r[offset_d + 2]),
-                    "p50": float(r[offset_d + 3]),
-                    "p80": float(r[offset_d + 4]),
-                    "p90": float(r[offset_d + 5]),
-                    "Jitter": float(r[offset_d + 6])}
+        Returns
+        -------
+        members : dict
+            Maps the names of the needed members (relative to the directory
+            of the tar file) to file objects. Missing members are left out.
 
-                if src_node != dst_node:
-                    globalPackets += pcktsGen
-                    globalLosses += pcktsDrop
-                    globalDelay += pcktsDelay
+        """
 
-                lst_result_flows = []
-                lst_traffic_flows = []
-                offset_f = netSize * netSize * numFlows * 3
-                for flow in range(numFlows):
-                    # Results:
-                    dict_result_tmp = {}
-                    offset_tf = (src_node * netSize * numFlows + dst_node * numFlows + flow) * 3
-                    offset_df = offset_f + (src_node * netSize * numFlows + dst_node * numFlows + flow) * 7
-                    dict_result_tmp = {
-                        'PktsDrop': numpy.round(float(f[offset_tf + 2]) / sim_time, 6),
-                        "AvgDelay": float(f[offset_df]),
-                        "p10": float(f[offset_df + 1]),
-                        "p20": float(f[offset_df + 2]),
-                        "p50": float(f[offset_df + 3]),
-                        "p80": float(f[offset_df + 4]),
-                        "p90": float(f[offset_df + 5]),
-                        "Jitter": float(f[offset_df + 6])}
-                    lst_result_flows.append(dict_result_tmp)
-                    # Traffic:
-                    dict_traffic = {'AvgBw': float(f[offset_tf]) * 1000,
-                                    'PktsGen': numpy.round(float(f[offset_tf + 1]) / sim_time, 6),
-                                    'TotalPktsGen': float(f[offset_tf + 1]), 'ToS': 0}
-                    self._timedistparams(dict_traffic)
-                    self._sizedistparams(dict_traffic)
-                    lst_traffic_flows.append(dict_traffic)
+        needed = {"params.ini", "Routing.txt", "simulationResults.txt"}
+        if self._needs_flows():
+            needed.add("flowSimulationResults.txt")
+        members = {}
+        dir_info = tar.next()
+        for member in tar:
+            name = member.name[len(dir_info.name) + 1:]
+            if name not in needed or name in members:
+                continue
+            if len(members) == len(needed) - 1:
+                members[name] = tar.extractfile(member)
+                break
+            members[name] = io.BytesIO(tar.extractfile(member).read())
+        return members
 
-                dict_traffic_srcdst = {}
-                # From kbps to bps
-                dict_traffic_agg = {'AvgBw': float(r[offset_t]) * 1000,
-                                    'PktsGen': numpy.round(pcktsGen / sim_time, 6),
-                                    'TotalPktsGen': pcktsGen}
+    def _decode_tar_lines(self, tar_path, results_file, flowresults_file, simParameters, keep=None):
+        """
+        Decodes the lines of the results files of a tar file. If keep is
+        given, the lines for which it is False are skipped undecoded.
 
-                dict_result_srcdst['AggInfo'] = dict_result_agg
-                dict_result_srcdst['Flows'] = lst_result_flows
-                dict_traffic_srcdst['AggInfo'] = dict_traffic_agg
-                dict_traffic_srcdst['Flows'] = lst_traffic_flows
-                new_result_row.append(dict_result_srcdst)
-                new_traffic_row.append(dict_traffic_srcdst)
+        Unless the samples are lazy, the whole results file is read first and
+        its numeric fields are converted at once (see _parse_results_block).
 
-            m_result.append(new_result_row)
-            m_traffic.append(new_traffic_row)
-        m_result = numpy.asmatrix(m_result)
-        m_traffic = numpy.asmatrix(m_traffic)
-        s._set_performance_matrix(m_result)
-        s._set_traffic_matrix(m_traffic)
-        s._set_global_packets(numpy.round(globalPackets / sim_time, 6))
-        s._set_global_losses(numpy.round(globalLosses / sim_time, 6))
-        s._set_global_delay(globalDelay / (netSize * (netSize - 1)))
+        Yields
+        ------
+        s : Sample
+            Sample decoded from the line, without routing nor topology.
+        values : array or None
+            Numeric fields of the line, None for lazy samples.
+
+        """
+
+        if not (self.lazy and self.cache is None):
+            rlines = []
+            while True:
+                rline = results_file.readline()
+                if len(rline) <= 2:
+                    break
+                rlines.append(rline)
+            lines = [line for line in range(len(rlines)) if keep is None or keep[line]]
+            block = self._parse_results_block([rlines[line] for line in lines])
+            row = 0
+            for line in range(len(rlines)):
+                fline = flowresults_file.readline() if flowresults_file else None
+                if keep is None or keep[line]:
+                    # A copy of the row, so that the sample does not keep the
+                    # whole block alive
+                    yield self._decode_line(tar_path, line, rlines[line], fline, simParameters, block[row].copy())
+                    row += 1
+            return
+
+        line = 0
+        while True:
+            rline = results_file.readline()
+            fline = flowresults_file.readline() if flowresults_file else None
+            if len(rline) <= 2:
+                break
+            if keep is None or keep[line]:
+                yield self._decode_line(tar_path, line, rline, fline, simParameters)
+            line += 1
+
+    def _decode_line(self, tar_path, line, rline, fline, simParameters, values=None):
+        """
+        Decodes one line of the results file (and of the flows file).
+
+        Parameters
+        ----------
+        tar_path : str
+            Path of the tar file the line comes from.
+        line : int
+            Index of the line in the results file.
+        rline, fline : bytes
+            Raw lines of the results and flows files (fline may be None).
+        simParameters : dict
+            Parameters read from params.ini.
+        values : array
+            Numeric fields of rline, if already parsed.
+
+        Returns
+        -------
+        s : Sample
+            Sample decoded from the line, without routing nor topology.
+        values : array or None
+            Numeric fields of the line when they were parsed.
 
-    # Dataset v0 only contain exponential traffic with avg packet size of 1000
-    def _timedistparams(self, dict_traffic):
         """
-    
+
+        if self.lazy and self.cache is None:
+            s = LazySample(self, rline, fline, simParameters)
+            s._set_data_set_file_name(tar_path)
+            s._set_data_set_line(line)
+            return s, None
+
+        s = Sample()
+        s._set_data_set_file_name(tar_path)
+        s._set_data_set_line(line)
+        values = self._decode_sample(s, rline, fline, simParameters, values)
+        return s, values
+
+    def _decode_sample(self, s, rline, fline, simParameters, values=None):
+        """
+        Fills s with the information of the raw lines rline and fline, using
+        the numeric fields of rline in values if given. Returns the numeric
+        fields of the line when they were parsed, else None.
+        """
+
+        s._results_line = rline.decode()[:-2]
+        s._flowresults_line = fline.decode()[:-2] if fline else None
+
+        if self.decode == "columnar":
+            if values is None:
+                return self._process_columnar_results_line(s._results_line, simParameters, s)
+            self._process_columnar_values(values, simParameters, s)
+            return values
+        self._process_flow_results_traffic_line(s._results_line if values is None else values.tolist(),
+                                                s._flowresults_line, simParameters, s)
+        return values
+
+    @staticmethod
+    def _parse_results_block(rlines):
+        """
+        Converts several raw lines of a results file into numbers with a
+        single call instead of a split and a float conversion per line.
 
         Parameters
         ----------
-        dict_traffic: dictionary
-            Dictionary to fill with the time distribution information
-            extracted from data
-    
+        rlines : list
+            Raw lines (bytes) of simulationResults.txt, each one ending with
+            ",\n".
+
+        Returns
+        -------
+        values : array (len(rlines), fields)
+            Numeric fields of each line. Row k is what the per-line decoders
+            get from splitting rlines[k].
 
         """
 
-        dict_traffic['TimeDist'] = TimeDist.EXPONENTIAL_T
-        params = {'EqLambda': dict_traffic['AvgBw'], 'AvgPktsLambda': dict_traffic['AvgBw'] / 1000, 'ExpMaxFactor': 10}
-        dict_traffic['TimeDistParams'] = params
+        if not rlines:
+            return numpy.empty((0, 0))
+        fields = rlines[0].rstrip().count(b',')
+        text = io.StringIO(b"".join(rlines).decode())
+        return numpy.loadtxt(text, dtype=numpy.float64, delimiter=',', usecols=range(fields), ndmin=2)
 
-    # Dataset v0 only contains binomial traffic with avg packet size of 1000
-    def _sizedistparams(self, dict_traffic):
+    def _iter_tar_file(self, tar_path, g, keep=None):
         """
-    
+        Decodes the samples of one tar file, storing them in the cache when
+        it is enabled.
 
         Parameters
         ----------
-        dict_traffic : dictionary
-            Dictionary to fill with the size distribution information
-            extracted from data
-
-=======
-        
+        tar_path : str
+            Path of the tar file.
+        g : graph
+            Graph of the topology the tar file belongs to.
+        keep : list of bool
+            Lines to decode (see _lines_to_keep). None decodes all of them.
 
         Yields
         ------
         s : Sample
-            Sample instance containing information about the last line read
-            from the dataset.
+            One sample per decoded line of the results file.
+
+        """
+
+        tar, results_file, flowresults_file, simParameters, R = self._open_tar_file(tar_path, g.number_of_nodes())
+        try:
+            routing_matrix = self._routing_matrix_from_ports(g, R)
+            tar_key = self.cache.tar_key(tar_path, self._cache_mode()) if self.cache else None
+            num_lines = 0
+            for s, values in self._decode_tar_lines(tar_path, results_file, flowresults_file, simParameters, keep):
+                if tar_key is not None:
+                    self.cache.store(SampleCache.line_key(tar_key, s._get_data_set_line()),
+                                     self._cache_entry(s, values))
+                s._set_routing_matrix(routing_matrix)
+                s._set_topology_object(g)
+                num_lines += 1
+                yield s
+        finally:
+            tar.close()
+
+        if tar_key is not None:
+            # Skipped lines are not cached, but they count in the manifest
+            self._store_cache_manifest(tar_key, num_lines if keep is None else len(keep), simParameters, R)
+
+    def _iter_tar_files_parallel(self, tar_paths, g):
+        """
+        Same as calling _iter_tar_file on every path of tar_paths, but with
+        the tar files not found in the cache parsed in a process pool. At most
+        2 * workers tar files are in flight, and samples are yielded in the
+        order of tar_paths.
+        """
+
+        config = (self.data_folder, self.intensity_values, self.decode, self.detail,
+                  self.lazy and self.cache is None)
+        parse = functools.partial(_parse_tar_file, config, netSize=g.number_of_nodes())
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        # (tar_path, keep, future): future is None for the tar files found in
+        # the cache, which are only read from it when their turn comes, since
+        # the entries may be evicted while the tar files ahead are parsed
+        pending = collections.deque()
+        in_flight = 0
+        paths = iter(tar_paths)
+        try:
+            while True:
+                while in_flight < 2 * self.workers:
+                    tar_path = next(paths, None)
+                    if tar_path is None:
+                        break
+                    keep = self._lines_to_keep(tar_path)
+                    if self.cache and self._cached_manifest(tar_path, keep) is not None:
+                        pending.append((tar_path, keep, None))
+                    else:
+                        pending.append((tar_path, keep, executor.submit(parse, tar_path, keep=keep)))
+                        in_flight += 1
+                if not pending:
+                    break
+                tar_path, keep, future = pending.popleft()
+                if future is None:
+                    cached = self._iter_cached_tar_file(tar_path, g, keep)
+                    # Evicted since it was queued: parsed again in this process
+                    yield from (cached if cached is not None else self._iter_tar_file(tar_path, g, keep))
+                    continue
+                simParameters, R, decoded = future.result()
+                in_flight -= 1
+                routing_matrix = self._routing_matrix_from_ports(g, R)
+                tar_key = self.cache.tar_key(tar_path, self._cache_mode()) if self.cache else None
+                for s, values in decoded:
+                    if tar_key is not None:
+                        self.cache.store(SampleCache.line_key(tar_key, s._get_data_set_line()),
+                                         self._cache_entry(s, values))
+                    if isinstance(s, LazySample):
+                        s._reader = self
+                    s._set_routing_matrix(routing_matrix)
+                    s._set_topology_object(g)
+                    yield s
+                if tar_key is not None:
+                    self._store_cache_manifest(tar_key, len(decoded) if keep is None else len(keep),
+                                               simParameters, R)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _store_cache_manifest(self, tar_key, num_lines, simParameters, R):
+        """
+        Stores the per-tar information needed to rebuild its samples from the
+        cache. Written last: a tar file only counts as cached once all its
+        lines, or all the lines kept by the intensity filter, are.
+        """
+
+        self.cache.store(tar_key, {
+            'num_lines': numpy.array(num_lines),
+            'simulationTime': numpy.array(simParameters["simulationTime"]),
+            'avgLambdaMax': numpy.array(simParameters["avgLambdaMax"]),
+            'routing_ports': R})
+
+    def _cache_entry(self, s, values):
+        """
+        Returns the dictionary of arrays stored in the cache for sample s.
+        values holds the numeric fields of its results line, if already parsed.
+        """
+
+        if self.cache_full:
+            if values is None:
+                values = numpy.array(s._results_line.split(','), dtype=numpy.float64)
+            return {'values': values}
+        entry = {key: s.get_aggregate_matrix(key) for key in LATCAP_KEYS}
+        entry.update({'global_packets': numpy.array(s.global_packets),
+                      'global_losses': numpy.array(s.global_losses),
+                      'global_delay': numpy.array(s.global_delay)})
+        return entry
+
+    def _iter_cached_tar_file(self, tar_path, g, keep=None):
+        """
+        Returns a generator of the samples of tar_path loaded from the cache,
+        or None if some of them are not cached. Lines for which keep is False
+        are skipped.
+        """
+
+        cached = self._cached_manifest(tar_path, keep)
+        if cached is None:
+            return None
+        tar_key, manifest = cached
+        return self._cached_samples(tar_path, tar_key, manifest, g, keep)
+
+    def _cached_manifest(self, tar_path, keep=None):
+        """
+        Returns (tar_key, manifest) if the manifest of tar_path and the
+        entries of all its lines (those for which keep is True) are cached,
+        else None.
+        """
+
+        tar_key = self.cache.tar_key(tar_path, self._cache_mode())
+        manifest = self.cache.load(tar_key)
+        if manifest is None:
+            return None
+        for line in range(int(manifest['num_lines'])):
+            if keep is not None and not keep[line]:
+                continue
+            if not self.cache.contains(SampleCache.line_key(tar_key, line)):
+                return None
+        return tar_key, manifest
+
+    def _cached_samples(self, tar_path, tar_key, manifest, g, keep):
+        simParameters = {"simulationTime": int(manifest['simulationTime']),
+                         "avgLambdaMax": float(manifest['avgLambdaMax'])}
+        routing_matrix = self._routing_matrix_from_ports(g, manifest['routing_ports'])
+        for line in range(int(manifest['num_lines'])):
+            if keep is not None and not keep[line]:
+                continue
+            entry = self.cache.load(SampleCache.line_key(tar_key, line))
+            if entry is None:
+                # Evicted meanwhile (by this reader or another one sharing the
+                # cache): the remaining lines are decoded from the tar file
+                rest = [k >= line and (keep is None or keep[k]) for k in range(int(manifest['num_lines']))]
+                yield from self._iter_tar_file(tar_path, g, rest)
+                return
+            s = self._sample_from_cache_entry(entry, tar_path, line, simParameters)
+            s._set_routing_matrix(routing_matrix)
+            s._set_topology_object(g)
+            yield s
+
+    def _sample_from_cache_entry(self, entry, tar_path, line, simParameters):
+        """
+        Rebuilds a Sample, without routing nor topology, from the arrays
+        stored by _cache_entry.
+        """
+
+        s = Sample()
+        s._set_data_set_file_name(tar_path)
+        s._set_data_set_line(line)
+        if 'values' in entry:
+            if self.decode == "columnar":
+                self._process_columnar_values(entry['values'], simParameters, s)
+            else:
+                self._process_flow_results_traffic_line(entry['values'].tolist(), None, simParameters, s)
+        else:
+            s.maxAvgLambda = simParameters["avgLambdaMax"]
+            s._set_aggregate_matrices({key: entry[key] for key in LATCAP_KEYS})
+            s._set_global_packets(entry['global_packets'][()])
+            s._set_global_losses(entry['global_losses'][()])
+            s._set_global_delay(entry['global_delay'][()])
+        return s
 
+    def _index_path(self):
+        """
+        Returns the file where the line-offset index of this reader is kept:
+        next to the cache if there is one, otherwise in the data folder.
         """
 
-        g = None
-        graph_file = False
-        s_dirs = []
-        for root, dirs, files in os.walk(self.data_folder):
-            if "graph_attr.txt" in files:
-                g = networkx.read_gml(os.path.join(root, "graph_attr.txt"), destringizer=int)
-                graph_file = True
+        mode = "flows" if self._needs_flows() else "agg"
+        intensity = "-".join(str(v) for v in self.intensity_values) or "all"
+        name = ".datanet_index_seed{}_{}_{}.json".format(self.seed, intensity, mode)
+        if self.cache is not None:
+            name = hashlib.sha1(os.path.abspath(self.data_folder).encode()).hexdigest()[:12] + name
+            return os.path.join(self.cache.cache_dir, name)
+        return os.path.join(self.data_folder, name)
+
+    def index(self, rebuild=False):
+        """
+        Builds, or loads if it was already persisted and the tar files did not
+        change (none modified, added or removed), the index of the byte
+        offsets of every line of the results files in the decompressed tar
+        files. Sample k of the index is the k-th sample yielded by iterating a
+        reader with the same seed and intensity filter (with seed=None the tar
+        files are taken in sorted order): the lines dropped by filter_lines
+        are not indexed samples.
+
+        Parameters
+        ----------
+        rebuild : bool
+            Rebuild the index even if a valid one is persisted.
+
+        Returns
+        -------
+        int
+            Number of indexed samples.
+
+        """
+
+        path = self._index_path()
+        index = None
+        if not rebuild and os.path.exists(path):
+            with open(path) as f:
+                index = json.load(f)
+            if index.get("version") != INDEX_VERSION:
+                index = None
+            if index is not None:
+                current = {os.path.relpath(tar_path, self.data_folder)
+                           for _, _, tar_paths in self._walk_topologies(global_random=False)
+                           for tar_path in tar_paths}
+                if current != {entry["file"] for entry in index["tars"]}:
+                    index = None
+            for entry in (index["tars"] if index is not None else []):
+                tar_path = os.path.join(self.data_folder, entry["file"])
+                st = os.stat(tar_path) if os.path.exists(tar_path) else None
+                if st is None or (st.st_mtime_ns, st.st_size) != (entry["mtime_ns"], entry["size"]):
+                    index = None
+                    break
+
+        if index is None:
+            tars = []
+            for root, g, tar_paths in self._walk_topologies(global_random=False):
+                for tar_path in tar_paths:
+                    tars.append(self._index_tar_file(tar_path, root, g.number_of_nodes()))
+            index = {"version": INDEX_VERSION, "seed": self.seed, "tars": tars}
+            tmp_path = "{}.{}.tmp".format(path, os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, path)
+
+        self._index = index
+        self._index_by_file = {entry["file"]: entry for entry in index["tars"]}
+        # Line numbers of the indexed samples of every tar file
+        self._index_lines = []
+        self._index_starts = [0]
+        for entry in index["tars"]:
+            keep = self._entry_lines_to_keep(entry)
+            lines = range(len(entry["results"]["lines"]))
+            if keep is not None:
+                lines = [line for line in lines if keep[line]]
+            self._index_lines.append(lines)
+            self._index_starts.append(self._index_starts[-1] + len(lines))
+        return self._index_starts[-1]
+
+    def _index_tar_file(self, tar_path, root, netSize):
+        """
+        Returns the index entry of one tar file: its params.ini values, its
+        routing ports, the offsets of the lines of its results files and the
+        traffic intensity of every line.
+        """
+
+        entry = {"file": os.path.relpath(tar_path, self.data_folder),
+                 "root": os.path.relpath(root, self.data_folder),
+                 "mtime_ns": os.stat(tar_path).st_mtime_ns,
+                 "size": os.stat(tar_path).st_size,
+                 "flows": None}
+        results_data = None
+        tar = tarfile.open(tar_path, 'r:gz')
+        try:
+            dir_info = tar.next()
+            for member in tar:
+                name = member.name[len(dir_info.name) + 1:]
+                if name == "params.ini":
+                    entry["simParameters"] = self.__process_params_file(tar.extractfile(member))
+                elif name == "Routing.txt":
+                    entry["routing_ports"] = self._readRoutingFile(tar.extractfile(member), netSize).astype(int).tolist()
+                elif name == "simulationResults.txt":
+                    results_data = tar.extractfile(member).read()
+                    entry["results"] = self._index_member_lines(results_data, member.offset_data)
+                elif name == "flowSimulationResults.txt" and self._needs_flows():
+                    entry["flows"] = self._index_member_lines(tar.extractfile(member).read(), member.offset_data)
+        finally:
+            tar.close()
+        for name, key in (("params.ini", "simParameters"), ("Routing.txt", "routing_ports"),
+                          ("simulationResults.txt", "results")):
+            if key not in entry:
+                raise ValueError('{} has no {} member'.format(tar_path, name))
+        entry["results"]["intensity"] = self._line_intensities(results_data, entry["results"]["lines"],
+                                                               entry["simParameters"]["simulationTime"])
+        return entry
+
+    @staticmethod
+    def _index_member_lines(data, offset):
+        """
+        Returns the offset of a member in the decompressed tar file and the
+        offsets of its lines, stopping, as the iterator does, at the first
+        line with no content.
+        """
+
+        data = numpy.frombuffer(data, dtype=numpy.uint8)
+        ends = numpy.flatnonzero(data == ord('\n')) + 1
+        if len(ends) == 0 or ends[-1] != len(data):
+            ends = numpy.append(ends, len(data))
+        starts = numpy.concatenate(([0], ends[:-1]))
+        empty = numpy.flatnonzero(ends - starts <= 2)
+        if len(empty):
+            starts = starts[:empty[0]]
+        return {"offset": offset, "lines": starts.tolist()}
+
+    @staticmethod
+    def _line_intensities(data, starts, sim_time):
+        """
+        Returns the traffic intensity of every line of a results file.
+
+        Lines carry no explicit intensity, only the tar file name gives its
+        range. It is estimated as the largest average rate of generated
+        packets between two different nodes (TotalPktsGen / simulationTime),
+        i.e. the largest lambda of the traffic matrix of the line.
+
+        Parameters
+        ----------
+        data : bytes
+            Content of simulationResults.txt.
+        starts : list
+            Offsets of the lines to evaluate.
+        sim_time : int
+            Simulation duration read from params.ini.
+
+        Returns
+        -------
+        list of float
+            Intensity of each line.
+
+        """
+
+        intensities = []
+        ends = list(starts[1:]) + [len(data)]
+        for start, end in zip(starts, ends):
+            values = numpy.array(data[start:end].rstrip(b',\r\n').split(b','), dtype=numpy.float64)
+            netSize = int(math.sqrt(len(values) / 10))
+            pkts_gen = values[:netSize * netSize * 3].reshape(netSize, netSize, 3)[..., 1]
+            intensities.append(float(pkts_gen[~numpy.eye(netSize, dtype=bool)].max() / sim_time))
+        return intensities
+
+    def _lines_to_keep(self, tar_path):
+        """
+        Selects the lines of tar_path within the requested intensity range.
+
+        Parameters
+        ----------
+        tar_path : str
+            Path of a tar file to be read.
+
+        Returns
+        -------
+        keep : list of bool or None
+            For the tar files that may hold lines out of the requested
+            intensity range (see _check_intensity) when filter_lines is set,
+            whether each line is in range according to the line-offset index.
+            None if all the lines have to be read.
+
+        """
+
+        if not self.filter_lines or len(self.intensity_values) < 2:
+            return None
+        if self._check_intensity(os.path.basename(tar_path)) != 1:
+            return None
+        if self._index is None:
+            self.index()
+        return self._entry_lines_to_keep(self._index_by_file[os.path.relpath(tar_path, self.data_folder)])
+
+    def _entry_lines_to_keep(self, entry):
+        """
+        _lines_to_keep for the tar file of an index entry, from the line
+        intensities stored in the entry.
+        """
+
+        if not self.filter_lines or len(self.intensity_values) < 2:
+            return None
+        if self._check_intensity(os.path.basename(entry["file"])) != 1:
+            return None
+        low, high = self.intensity_values[0], self.intensity_values[1]
+        return [low <= intensity <= high for intensity in entry["results"]["intensity"]]
+
+    def __len__(self):
+        """
+        Returns the number of samples of the line-offset index (built if
+        needed).
+        """
+
+        if self._index is None:
+            self.index()
+        return self._index_starts[-1]
+
+    def __getitem__(self, k):
+        """
+        Returns the k-th sample of the line-offset index, reading only its
+        line (see take).
+        """
+
+        return self.take([k])[0]
+
+    def head(self, n):
+        """
+        Returns the first n samples of an iteration of the reader, which is
+        then stopped and its files closed. Unlike take, it does not need the
+        line-offset index; with seed=None the tar files are shuffled as in
+        any iteration.
+
+        Parameters
+        ----------
+        n : int
+            Maximum number of samples.
+
+        Returns
+        -------
+        list of Sample
+
+        """
+
+        if not _is_integer(n):
+            raise TypeError('head expects an integer, got {!r}'.format(n))
+        it = iter(self)
+        try:
+            return [s for _, s in zip(range(n), it)]
+        finally:
+            it.close()
+
+    def take(self, indices):
+        """
+        Returns the samples of the line-offset index with the given ids (the
+        lines dropped by filter_lines are not counted), seeking straight to
+        their lines instead of parsing the samples before them. The lines of
+        the same tar file are read in a single forward pass.
+
+        Parameters
+        ----------
+        indices : iterable of int, or int
+            Sample ids (negative ids count from the end). A single int n is
+            the same as range(n): the first n samples of the index (see head
+            for the first n samples of an iteration).
+
+        Returns
+        -------
+        list of Sample
+            Samples in the order of indices.
+
+        """
+
+        if _is_integer(indices):
+            indices = range(indices)
+        elif isinstance(indices, (numbers.Number, numpy.bool_)):
+            raise TypeError('take expects an integer or an iterable of integers, got {!r}'.format(indices))
+        wanted = collections.defaultdict(list)
+        indices = list(indices)
+        for position, k in enumerate(indices):
+            tar_index, line = self._index_position(k)
+            wanted[tar_index].append((line, position))
+
+        samples = [None] * len(indices)
+        for tar_index, lines in wanted.items():
+            for position, s in self._read_indexed_lines(self._index["tars"][tar_index], sorted(lines)):
+                samples[position] = s
+        return samples
+
+    def locate(self, k):
+        """
+        Returns where the k-th sample of the line-offset index (built if
+        needed) is stored. Samples with the same file are read together by
+        take.
+
+        Parameters
+        ----------
+        k : int
+            Sample id (negative ids count from the end).
+
+        Returns
+        -------
+        file : str
+            Path of its tar file, relative to the data folder.
+        line : int
+            Line of the sample in the results file of the tar file.
+
+        """
+
+        tar_index, line = self._index_position(k)
+        return self._index["tars"][tar_index]["file"], line
+
+    def _index_position(self, k):
+        """
+        Returns the (position in the index, line) of the tar file holding the
+        k-th sample of the line-offset index.
+        """
+
+        if not _is_integer(k):
+            raise TypeError('sample indices must be integers, got {!r}'.format(k))
+        n = len(self)
+        if not -n <= k < n:
+            raise IndexError('sample index {} out of range'.format(k))
+        if k < 0:
+            k += n
+        tar_index = bisect.bisect_right(self._index_starts, k) - 1
+        return tar_index, self._index_lines[tar_index][k - self._index_starts[tar_index]]
+
+    def _read_indexed_lines(self, entry, lines):
+        """
+        Reads and decodes the given (line, position) pairs, sorted by line, of
+        an indexed tar file.
+        """
+
+        tar_path = os.path.join(self.data_folder, entry["file"])
+        root = os.path.normpath(os.path.join(self.data_folder, entry["root"]))
+        g = self._graphs.get(root)
+        if g is None:
+            g = self._get_graph_for_folder(root)
+        simParameters = entry["simParameters"]
+        routing_matrix = self._routing_matrix_from_ports(g, numpy.array(entry["routing_ports"]))
+        tar_key = self.cache.tar_key(tar_path, self._cache_mode()) if self.cache else None
+
+        for line, position in lines:
+            entry_cached = self.cache.load(SampleCache.line_key(tar_key, line)) if tar_key else None
+            if entry_cached is not None:
+                s = self._sample_from_cache_entry(entry_cached, tar_path, line, simParameters)
             else:
-                s_dir = root.replace(self.data_folder, '')
-                if s_dir != '':
-                    s_dirs.append(root.replace(self.data_folder, ''))
-                continue
-            self.__process_graph(g)
-            tar_files = [f for f in files if f.endswith("tar.gz")]
-            random.shuffle(tar_files)
-            for file in tar_files:
-                if len(self.intensity_values) == 0:
-                    feasibility_of_file = 2
-                else:
-                    feasibility_of_file = self._check_intensity(file)
+                results, flows = self._open_archive(tar_path, entry["flows"] is not None)
+                results.seek(entry["results"]["offset"] + entry["results"]["lines"][line])
+                rline = results.readline()
+                fline = None
+                if flows is not None:
+                    flows.seek(entry["flows"]["offset"] + entry["flows"]["lines"][line])
+                    fline = flows.readline()
+                s, values = self._decode_line(tar_path, line, rline, fline, simParameters)
+                if tar_key is not None:
+                    self.cache.store(SampleCache.line_key(tar_key, line), self._cache_entry(s, values))
+            s._set_routing_matrix(routing_matrix)
+            s._set_topology_object(g)
+            yield position, s
+
+    def _open_archive(self, tar_path, with_flows):
+        """
+        Returns the (results, flows) decompressed streams of tar_path used by
+        random access, opening them if needed. At most max_open_archives tar
+        files are kept open: the least recently used one is closed first.
+        Seeking forward in a stream is cheap, seeking backward restarts the
+        decompression.
+        """
+
+        handles = self._archives.get(tar_path)
+        if handles is not None:
+            self._archives.move_to_end(tar_path)
+            return handles
+        while self._archives and len(self._archives) >= max(self.max_open_archives, 1):
+            self._close_archive(self._archives.popitem(last=False)[1])
+        handles = (gzip.open(tar_path, 'rb'), gzip.open(tar_path, 'rb') if with_flows else None)
+        self._archives[tar_path] = handles
+        return handles
 
-                if feasibility_of_file != 0:
-                    tar = tarfile.open(os.path.join(root, file), 'r:gz')
-                    dir_info = tar.next()
-                    routing_file = tar.extractfile(dir_info.name + "/Routing.txt")
-                    results_file = tar.extractfile(dir_info.name + "/simulationResults.txt")
-                    if dir_info.name + "/flowSimulationResults.txt" in tar.getnames():
-                        flowresults_file = tar.extractfile(dir_info.name + "/flowSimulationResults.txt")
-                    else:
-                        flowresults_file = None
-                    params_file = tar.extractfile(dir_info.name + "/params.ini")
-                    simParameters = self.__process_params_file(params_file)
-
-                    routing_matrix = self._create_routing_matrix(g, routing_file)
-                    while True:
-                        s = Sample()
-                        s._set_data_set_file_name(os.path.join(root, file))
-
-                        s._results_line = results_file.readline().decode()[:-2]
-                        if flowresults_file:
-                            s._flowresults_line = flowresults_file.readline().decode()[:-2]
-                        else:
-                            s._flowresults_line = None
-
-                        if len(s._results_line) == 0:
-                            break
-
-                        self._process_flow_results_traffic_line(s._results_line, s._flowresults_line, simParameters, s)
-                        s._set_routing_matrix(routing_matrix)
-                        s._set_topology_object(g)
-                        yield s
-        if not graph_file:
-            print('ERROR: The API was not able to find the graph information file in any of the following dirs {}.'
-                  .format(s_dirs))
+    @staticmethod
+    def _close_archive(handles):
+        for f in handles:
+            if f is not None:
+                f.close()
 
     def _process_flow_results_traffic_line(self, rline, fline, simParameters, s):
         """
@@ -1180,8 +1946,9 @@ class DatanetAPI:
 
         Parameters
         ----------
-        rline : str
-            Last line read in the results file.
+        rline : str or list
+            Last line read in the results file, or its fields already split
+            or parsed.
         fline : str
             Last line read in the flows file.
         s : Sample
@@ -1194,18 +1961,22 @@ class DatanetAPI:
         """
 
         sim_time = simParameters["simulationTime"]
-        r = rline.split(',')
-        if fline:
-            f = fline.split(',')
+        r = rline.split(',') if isinstance(rline, str) else rline
+        netSize = int(math.sqrt(len(r) / 10))
+        if not self._needs_flows():
+            f = None
+            numFlows = 0
         else:
-            f = r
+            if fline:
+                f = fline.split(',')
+            else:
+                f = r
+            numFlows = int(len(f) / (netSize * netSize * 10))
 
         s.maxAvgLambda = simParameters["avgLambdaMax"]
 
         m_result = []
         m_traffic = []
-        netSize = int(math.sqrt(len(r) / 10))
-        numFlows = int(len(f) / (netSize * netSize * 10))
         globalPackets = 0
         globalLosses = 0
         globalDelay = 0
@@ -1269,9 +2040,10 @@ class DatanetAPI:
                                     'TotalPktsGen': pcktsGen}
 
                 dict_result_srcdst['AggInfo'] = dict_result_agg
-                dict_result_srcdst['Flows'] = lst_result_flows
                 dict_traffic_srcdst['AggInfo'] = dict_traffic_agg
-                dict_traffic_srcdst['Flows'] = lst_traffic_flows
+                if f is not None:
+                    dict_result_srcdst['Flows'] = lst_result_flows
+                    dict_traffic_srcdst['Flows'] = lst_traffic_flows
                 new_result_row.append(dict_result_srcdst)
                 new_traffic_row.append(dict_traffic_srcdst)
 
@@ -1285,6 +2057,104 @@ class DatanetAPI:
         s._set_global_losses(numpy.round(globalLosses / sim_time, 6))
         s._set_global_delay(globalDelay / (netSize * (netSize - 1)))
 
+    def _process_columnar_results_line(self, rline, simParameters, s):
+        """
+        Columnar counterpart of _process_flow_results_traffic_line. Only the
+        aggregated information is decoded, straight into dense arrays.
+
+        Parameters
+        ----------
+        rline : str
+            Last line read in the results file.
+        simParameters : dict
+            Parameters read from the params.ini file of the tar file.
+        s : Sample
+            Instance of Sample associated with the current iteration.
+
+        Returns
+        -------
+        values : array
+            Numeric fields of the line.
+
+        """
+
+        values = numpy.array(rline.split(','), dtype=numpy.float64)
+        self._process_columnar_values(values, simParameters, s)
+        return values
+
+    def _process_columnar_values(self, values, simParameters, s):
+        """
+        Fills s from the numeric fields of a results line.
+        """
+
+        netSize = int(math.sqrt(len(values) / 10))
+        aggregate, globalPackets, globalLosses, globalDelay = self._decode_aggregate_block(
+            values, netSize, simParameters["simulationTime"])
+
+        if not self.cache_full:
+            aggregate = {key: aggregate[key] for key in LATCAP_KEYS}
+
+        s.maxAvgLambda = simParameters["avgLambdaMax"]
+        # The delay matrices are strided views of values
+        s._set_aggregate_matrices({key: numpy.ascontiguousarray(matrix) for key, matrix in aggregate.items()})
+        s._set_global_packets(globalPackets)
+        s._set_global_losses(globalLosses)
+        s._set_global_delay(globalDelay)
+
+    @staticmethod
+    def _decode_aggregate_block(values, netSize, sim_time):
+        """
+        Reshapes the numeric fields of one or several results lines into the
+        aggregate matrices, applying the same unit conversions as the
+        dictionary decoder.
+
+        Parameters
+        ----------
+        values : array (..., netSize*netSize*10)
+            Numeric fields of the results line(s).
+        netSize : int
+            Number of nodes in the network.
+        sim_time : int
+            Simulation duration read from params.ini.
+
+        Returns
+        -------
+        aggregate : dict
+            Maps each key of AGGREGATE_KEYS to a (..., netSize, netSize) array.
+        globalPackets, globalLosses, globalDelay : float or array (...)
+            Global statistics of the sample(s).
+
+        """
+
+        offset = netSize * netSize * 3
+        lead = values.shape[:-1]
+        traffic = values[..., :offset].reshape(lead + (netSize, netSize, 3))
+        delay = values[..., offset:offset + netSize * netSize * 7].reshape(lead + (netSize, netSize, 7))
+
+        aggregate = {key: delay[..., k] for k, key in enumerate(DELAY_FIELDS)}
+        # From kbps to bps
+        aggregate['AvgBw'] = traffic[..., 0] * 1000
+        aggregate['PktsGen'] = numpy.round(traffic[..., 1] / sim_time, 6)
+        aggregate['PktsDrop'] = numpy.round(traffic[..., 2] / sim_time, 6)
+
+        off_diagonal = ~numpy.eye(netSize, dtype=bool)
+        globalPackets = numpy.round(DatanetAPI._sequential_sum(traffic[..., 1][..., off_diagonal]) / sim_time, 6)
+        globalLosses = numpy.round(DatanetAPI._sequential_sum(traffic[..., 2][..., off_diagonal]) / sim_time, 6)
+        globalDelay = DatanetAPI._sequential_sum(delay[..., 0][..., off_diagonal]) / (netSize * (netSize - 1))
+        return aggregate, globalPackets, globalLosses, globalDelay
+
+    @staticmethod
+    def _sequential_sum(values):
+        """
+        Sums the last axis of values one element after the other, in the same
+        order as the dictionary decoder, so that the global statistics are
+        bit-for-bit the same (numpy's sum adds pairwise).
+        """
+
+        if values.shape[-1] == 0:
+            return values.sum(axis=-1)
+        return numpy.cumsum(values, axis=-1)[..., -1]
+
     # Dataset v0 only contain exponential traffic with avg packet size of 1000
     def _timedistparams(self, dict_traffic):
         """
@@ -1314,8 +2184,44 @@ class DatanetAPI:
             Dictionary to fill with the size distribution information
             extracted from data
 
->>>>>>> Stashed changes
         """
         dict_traffic['SizeDist'] = SizeDist.BINOMIAL_S
         params = {'AvgPktSize': 1000, 'PktSize1': 300, 'PktSize2': 1700}
-        dict_traffic['SizeDistParams'] = params
\ No newline at end of file
+        dict_traffic['SizeDistParams'] = params
+
+
+def _parse_tar_file(config, tar_path, netSize, keep=None):
+    """
+    Process pool task of DatanetAPI(..., workers=n): decompresses and decodes
+    every line of one tar file.
+
+    Parameters
+    ----------
+    config : tuple
+        (data_folder, intensity_values, decode, detail, lazy) of the reader.
+    tar_path : str
+        Path of the tar file.
+    netSize : int
+        Number of nodes in the network.
+    keep : list of bool
+        Lines to decode, None for all of them.
+
+    Returns
+    -------
+    simParameters : dict
+        Parameters read from params.ini.
+    R : netSize x netSize matrix
+        Output ports read from Routing.txt.
+    decoded : list
+        (Sample, values) pairs of _decode_tar_lines, in line order.
+
+    """
+
+    data_folder, intensity_values, decode, detail, lazy = config
+    reader = DatanetAPI(data_folder, intensity_values, decode=decode, detail=detail, lazy=lazy)
+    tar, results_file, flowresults_file, simParameters, R = reader._open_tar_file(tar_path, netSize)
+    try:
+        decoded = list(reader._decode_tar_lines(tar_path, results_file, flowresults_file, simParameters, keep))
+    finally:
+        tar.close()
+    return simParameters, R, decoded
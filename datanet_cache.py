@@ -0,0 +1,139 @@
+"""
+Persistent on-disk cache of the samples decoded by DatanetAPI.
+
+Every entry is a .npz file named after a hash of the tar file path, its
+modification time and size, the parse mode and the line index, so editing or
+replacing a tar file invalidates its entries. The total size of the cache
+directory is bounded: when it grows past max_bytes the least recently used
+entries are evicted.
+"""
+import os
+import hashlib
+import collections
+import numpy
+
+
+class SampleCache:
+    """
+    LRU store of numpy arrays kept in .npz files inside cache_dir.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        """
+
+
+        Parameters
+        ----------
+        cache_dir : str
+            Directory where the entries are stored. Created if missing.
+        max_bytes : int
+            Upper bound of the total size of the entries. The least recently
+            used entries are removed when it is exceeded.
+
+        Returns
+        -------
+        None.
+
+        """
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._entries = None
+        self._total_bytes = 0
+
+    def tar_key(self, tar_path, mode):
+        """
+        Returns the key identifying the content of tar_path decoded with the
+        given parse mode.
+        """
+
+        st = os.stat(tar_path)
+        ident = "{}|{}|{}|{}".format(os.path.abspath(tar_path), st.st_mtime_ns, st.st_size, mode)
+        return hashlib.sha1(ident.encode()).hexdigest()
+
+    @staticmethod
+    def line_key(tar_key, line):
+        """
+        Returns the key of the line-th sample of the tar file with tar_key.
+        """
+
+        return "{}-{}".format(tar_key, line)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def contains(self, key):
+        return os.path.exists(self._path(key))
+
+    def load(self, key):
+        """
+        Returns a dictionary with the arrays stored under key, or None if the
+        entry is not cached. Loading an entry marks it as recently used.
+        """
+
+        path = self._path(key)
+        try:
+            with numpy.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if self._entries is not None and path in self._entries:
+            self._entries.move_to_end(path)
+        return arrays
+
+    def store(self, key, arrays):
+        """
+        Stores the dictionary of arrays under key and evicts the least
+        recently used entries if the cache exceeds max_bytes.
+        """
+
+        path = self._path(key)
+        tmp_path = "{}.{}.tmp.npz".format(path[:-4], os.getpid())
+        numpy.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        self._scan()
+        if path in self._entries:
+            self._total_bytes -= self._sizes[path]
+        st = os.stat(path)
+        self._entries[path] = None
+        self._entries.move_to_end(path)
+        self._sizes[path] = st.st_size
+        self._total_bytes += st.st_size
+        self._evict(keep=path)
+
+    def _scan(self):
+        # _entries holds the paths from least to most recently used: sorted
+        # once by modification time here, then kept in order by load and
+        # store
+        if self._entries is not None:
+            return
+        found = []
+        self._sizes = {}
+        self._total_bytes = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npz") and ".tmp." not in entry.name:
+                st = entry.stat()
+                found.append((st.st_mtime_ns, entry.path))
+                self._sizes[entry.path] = st.st_size
+                self._total_bytes += st.st_size
+        self._entries = collections.OrderedDict((path, None) for _, path in sorted(found))
+
+    def _evict(self, keep=None):
+        while self._total_bytes > self.max_bytes and self._entries:
+            path = next(iter(self._entries))
+            if path == keep:
+                if len(self._entries) == 1:
+                    break
+                self._entries.move_to_end(path)
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._total_bytes -= self._sizes.pop(path)
+            del self._entries[path]
@@ -1,7 +1,6 @@
-import datanetAPI
-import networkx as nx
-import random
 import numpy as np
+from caracteristicas_topologia import caracteristicas_de
+from nucleo_heuristicas import AtribuicaoIncremental, ordem_por_grau, verifica_requisitos
 
 """# Fixando a seed para garantir a reprodutibilidade
 random.seed(42)
@@ -35,93 +34,49 @@ def solver(latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, cloud
     # Coloca o nó da cloud como um nó de fog
     fogs[node] = 1
 
-    # Define a matriz de atendimento
-    y = []
-    for i in range(n_nodes):
-        y.append([])
-        # Se o nó i é um fog, ele atende a si mesmo (autossuficiência)
-        if fogs[i] == 1:
-            for j in range(n_nodes):
-                y[i].append(1 if i == j else 0)  # yii = 1, yij = 0 para j != i
-        else:
-            # Se não é fog, encontra o fog mais próximo para atendê-lo
-            latencies_fogs = {k: latencias[i][k] for k in range(n_nodes) if fogs[k] == 1}
-            min_lat_node = min(latencies_fogs, key=latencies_fogs.get)
-            for j in range(n_nodes):
-                y[i].append(1 if min_lat_node == j else 0)
+    # Define o atendimento: cada fog atende a si mesmo e os demais nós são
+    # atendidos pelo fog mais próximo
+    atendimento = AtribuicaoIncremental(latencias, [node])
+    latencias_ = atendimento.latencias
+    capacidades_ = np.asarray(capacidades, dtype=np.float64)
 
-    requisitos_atendidos = [0 for _ in range(n_nodes)]
     # Calcula o grau dos nós (número de conexões) - EXCLUINDO a cloud
-    nos_mais_conectados = dict(nx.degree(dados.topology_object))
-    nos_mais_conectados.pop(node, None)  # Remove a cloud da lista de candidatos
-    
-    def desempate(nos):
-        # Ordena os nós primeiro pelo grau (decrescente) e depois pela latência (decrescente)
-        ordenacao = sorted(nos, key=lambda x: (nos[x], latencias[x][node]), reverse=True)
-        return ordenacao
+    # dados pode ser o Sample, o grafo da topologia ou suas características;
+    # o grau é calculado uma vez por topologia
+    graus = caracteristicas_de(dados).grau
+    # Ordem de inserção dos fogs: grau decrescente e, em empate, latência até a
+    # cloud decrescente. Grau e latência não mudam durante a execução, então a
+    # ordem é calculada uma vez e percorrida com um cursor
+    ordem = ordem_por_grau(graus, latencias_[:, node], node, decrescente=True)
+    proximo = 0
 
     # Enquanto houver nós não atendidos
-    while sum(requisitos_atendidos) < n_nodes:
+    while True:
         
-        # Para cada nó, captura a latência entre ele e o nó que o atende
-        for i in range(n_nodes):
-            if fogs[i] == 1:
-                lat = latencias[i][node]
-                cap = capacidades[i][node]
-                if lat < L_cloud_fog and cap > C_cloud_fog:
-                    requisitos_atendidos[i] = 1
-                else:
-                    requisitos_atendidos[i] = 0
-            else:
-                lat = latencias[i][y[i].index(1)]
-                cap = capacidades[i][y[i].index(1)]
-                if lat < L_max and cap > C_min:
-                    requisitos_atendidos[i] = 1
-                else:
-                    requisitos_atendidos[i] = 0
-        # se sum(requisitos_atendidos) == n_nodes, então todos os nós foram atendidos
-        if sum(requisitos_atendidos) == n_nodes:
+        # Verifica os requisitos de todos os nós de uma vez
+        requisitos_atendidos = verifica_requisitos(latencias_, capacidades_, atendimento.atribuido, atendimento.fogs,
+                                                   node, L_max, C_min, L_cloud_fog, C_cloud_fog)
+        # se todos os requisitos foram atendidos, encerra o loop
+        if requisitos_atendidos.all():
             break
         if sum(fogs) >= n_nodes:
             # calcula a latência média da rede
-            total_latencia = 0
-            for i in range(n_nodes):
-                for j in range(n_nodes):
-                    total_latencia += latencias[i][j] * y[i][j]
-            media_latencia = total_latencia / n_nodes
+            media_latencia = atendimento.latencia_media()
             return n_nodes, fogs, media_latencia
         
         
-        # Pega a key do nó mais conectado com critério de desempate
-        no_fog = desempate(nos_mais_conectados)[0]
+        # Pega o próximo nó da ordem de grau com critério de desempate
+        no_fog = int(ordem[proximo])
+        proximo += 1
         # Coloca a fog nesse nó
         fogs[no_fog] = 1
-        # Remove o nó da lista de possíveis nós de fog
-        nos_mais_conectados.pop(no_fog)
-        
-        # Recalcula a matriz de atendimento y com base nos fogs atuais (autossuficiência)
-        y = []
-        for i in range(n_nodes):
-            y.append([])
-            # Se o nó i é um fog, ele atende a si mesmo (autossuficiência)
-            if fogs[i] == 1:
-                for j in range(n_nodes):
-                    y[i].append(1 if i == j else 0)  # yii = 1, yij = 0 para j != i
-            else:
-                # Se não é fog, encontra o fog mais próximo para atendê-lo
-                latencies_fogs = {k: latencias[i][k] for k in range(n_nodes) if fogs[k] == 1}
-                min_lat_node = min(latencies_fogs, key=latencies_fogs.get)
-                for j in range(n_nodes):
-                    y[i].append(1 if min_lat_node == j else 0)
+        # Atualiza o atendimento com o novo fog
+        atendimento.adiciona(no_fog)
     
     # coloca 1 na posição do nó da cloud
     fogs[node] = 1
     
     # calcula a latência média da rede
-    total_latencia = 0
-    for i in range(n_nodes):
-        for j in range(n_nodes):
-            total_latencia += latencias[i][j] * y[i][j]
-    media_latencia = total_latencia / n_nodes
+    media_latencia = atendimento.latencia_media()
     
     return sum(fogs) -1, fogs, media_latencia
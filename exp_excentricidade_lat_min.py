@@ -2,6 +2,7 @@ import datanetAPI
 import networkx as nx
 import random
 import numpy as np
+from nucleo_heuristicas import AtribuicaoIncremental, PontuacaoIncremental, verifica_requisitos, descreve_atendimento
 
 # Configurar seed para garantir reprodutibilidade
 random.seed(42)
@@ -9,7 +10,7 @@ np.random.seed(42)
 
 
 
-def solver(latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, cloud_position):
+def solver(latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, cloud_position, diagnostico=False):
     
     uni = 0.025/2
     L_max = uni*L_max # 10ms (tempo real) 80ms (jogos) 200ms (IoT)
@@ -24,106 +25,50 @@ def solver(latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, cloud
     # Coloca o nó da cloud como um nó de fog
     fogs[node] = 1
 
-    # Define a matriz de atendimento
-    y = []
-    for i in range(n_nodes):
-        y.append([])
-        latencies_fogs = {k: latencias[i][k] for k in range(n_nodes) if fogs[k] == 1}
-        min_lat_node = min(latencies_fogs, key=latencies_fogs.get)
-        for j in range(n_nodes):
-            y[i].append(1 if min_lat_node == j else 0)
+    # Define o atendimento: cada nó é atendido pelo fog mais próximo, e cada
+    # inserção de fog só atualiza a coluna do novo fog
+    atendimento = AtribuicaoIncremental(latencias, [node])
+    latencias_ = atendimento.latencias
+    capacidades_ = np.asarray(capacidades, dtype=np.float64)
 
-        # Seleciona todos os nós que possuem latência entre a cloud e o nó menor que L_cloud_fog
-        possiveis_nos_de_fog = [i for i in range(n_nodes) if latencias[i][node] < L_cloud_fog]
+    # Seleciona todos os nós que possuem latência entre a cloud e o nó menor que L_cloud_fog
+    possiveis_nos_de_fog = [i for i in range(n_nodes) if latencias[i][node] < L_cloud_fog]
 
-        requisitos_atendidos = [0 for _ in range(n_nodes)]
-        latencia_atendida = ['' for _ in range(n_nodes)]
-
-        # Seleciona o nó com a maior latência (ordem determinística)
-        latencias_nos_posssiveis_de_fog = {i: latencias[i][node] for i in possiveis_nos_de_fog}
-        latencias_nos_posssiveis_de_fog.pop(node, None)
-
-        # Converte para lista ordenada por chave para garantir determinismo
-        nos_ordenados = sorted(latencias_nos_posssiveis_de_fog.keys())    # Enquanto houver nós não atendidos
-    while sum(requisitos_atendidos) < n_nodes:
+    # Pontuação dos candidatos (exceto a cloud): a soma das latências até os
+    # fogs atuais, que no início é a latência até a cloud
+    latencias_nos_posssiveis_de_fog = PontuacaoIncremental(
+        latencias_, [i for i in possiveis_nos_de_fog if i != node], [node])
+    # Enquanto houver nós não atendidos
+    while True:
         
-
-        # Para cada nó, captura a latência entre ele e o nó que o atende
-        for i in range(n_nodes):
-            if fogs[i] == 1:
-                lat = latencias[i][node]
-                cap = capacidades[i][node]
-                if lat < L_cloud_fog and cap > C_cloud_fog:
-                    requisitos_atendidos[i] = 1
-                    latencia_atendida[i] = f"O nó de fog {i} é atendido pelo nó de cloud {node} com latência {lat}"
-                else:
-                    requisitos_atendidos[i] = 0
-                    latencia_atendida[i] = f"O nó de fog {i} não é atendido pelo nó de cloud {node} com latência {lat}"
-            else:
-                lat = latencias[i][y[i].index(1)]
-                cap = capacidades[i][y[i].index(1)]
-                if lat < L_max and cap > C_min:
-                    requisitos_atendidos[i] = 1
-                    latencia_atendida[i] = f"O nó {i} é atendido pelo nó de fog {y[i].index(1)} com latência {lat}"
-                else:
-                    requisitos_atendidos[i] = 0
-                    latencia_atendida[i] = f"O nó {i} não é atendido pelo nó de fog {y[i].index(1)} com latência {lat}"
+        # Verifica os requisitos de todos os nós de uma vez
+        requisitos_atendidos = verifica_requisitos(latencias_, capacidades_, atendimento.atribuido, atendimento.fogs,
+                                                   node, L_max, C_min, L_cloud_fog, C_cloud_fog)
+        if diagnostico:
+            print("\n".join(descreve_atendimento(latencias_, atendimento.atribuido, atendimento.fogs, node, requisitos_atendidos)))
                     
-        if not latencias_nos_posssiveis_de_fog: # se não houver mais nós possíveis de fog, retorna o número de nós e os nós de fog
+        if not latencias_nos_posssiveis_de_fog.restantes(): # se não houver mais nós possíveis de fog, retorna o número de nós e os nós de fog
             # calcula a latência média da rede
-            total_latencia = 0
-            for i in range(n_nodes):
-                for j in range(n_nodes):
-                    total_latencia += latencias[i][j] * y[i][j]
-            media_latencia = total_latencia / n_nodes
+            media_latencia = atendimento.latencia_media()
             return n_nodes, fogs, media_latencia
         
         # se todos os requisitos foram atendidos, encessa o loop
-        if sum(requisitos_atendidos) == n_nodes:
+        if requisitos_atendidos.all():
             break
         # caso contrário, adiciona um nó de fog e testa novamente
         
         
         
-        # Pega a key do nó com a maior latência (determinístico)
-        if latencias_nos_posssiveis_de_fog:
-            no_fog = max(latencias_nos_posssiveis_de_fog.keys(), key=lambda k: (latencias_nos_posssiveis_de_fog[k], k))
-        else:
-            # Se não há mais nós possíveis, pega o primeiro da lista ordenada
-            no_fog = min(nos_ordenados) if nos_ordenados else node
+        # Pega o nó com a maior latência (em empate, o de maior índice)
+        no_fog = latencias_nos_posssiveis_de_fog.maior()
         # Coloca a fog nesse nó
         fogs[no_fog] = 1
-        # Remove o nó da lista de possíveis nós de fog
-        latencias_nos_posssiveis_de_fog.pop(no_fog)
-        
-        # pega as chaves do arrat fogs em que o valor é 1
-        fogs_values = [i for i in range(n_nodes) if fogs[i] == 1]
-        
-
-        for chave in sorted(latencias_nos_posssiveis_de_fog.keys()):  # Ordem determinística
-            # pega a linha da matriz de latencias que corresponde ao nó
-            linha = latencias[chave]
-            # multiplica a linha pelo vetor de fogs
-            latencias_ = np.array(linha) * np.array(fogs)
-            # soma os valores do vetor
-            latencia_ecentricidade = sum(latencias_)
-            latencias_nos_posssiveis_de_fog[chave] = latencia_ecentricidade
+        # Remove o nó da lista de possíveis nós de fog e soma a coluna do novo
+        # fog à pontuação dos restantes
+        latencias_nos_posssiveis_de_fog.adiciona(no_fog)
         
-        # Recalcula a matriz de atendimento y com base nos fogs atuais (reatribui ao fog mais próximo)
-        y = []
-        for i in range(n_nodes):
-            y.append([])
-            # Se o nó i é um fog, ele atende a si mesmo (autossuficiência)
-            if fogs[i] == 1:
-                for j in range(n_nodes):
-                    y[i].append(1 if i == j else 0)  # yii = 1, yij = 0 para j != i
-            else:
-                # Se não é fog, encontra o fog mais próximo para atendê-lo
-                latencies_fogs = {k: latencias[i][k] for k in range(n_nodes) if fogs[k] == 1}
-                # segurança: se não houver fog (não deve ocorrer), mantém cloud como destino
-                min_lat_node = min(latencies_fogs, key=latencies_fogs.get)
-                for j in range(n_nodes):
-                    y[i].append(1 if min_lat_node == j else 0)
+        # Atualiza o atendimento com o novo fog (autossuficiência e fog mais próximo)
+        atendimento.adiciona(no_fog)
             
         
     # para cada elemento de fogs
@@ -131,10 +76,6 @@ def solver(latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, cloud
     fogs[cloud_position] = 1
     
     # calcula a latência média da rede
-    total_latencia = 0
-    for i in range(n_nodes):
-        for j in range(n_nodes):
-            total_latencia += latencias[i][j] * y[i][j]
-    media_latencia = total_latencia / n_nodes
+    media_latencia = atendimento.latencia_media()
     
     return sum(fogs) -1, fogs, media_latencia
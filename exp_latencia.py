@@ -14,14 +14,19 @@ import exp_excentricidade_lat_min
 import exp_excentricidade_cap_max_v2
 import exp_conectividade_lat_max
 import exp_conectividade_cap_min
+import varredura_requisitos
 
-def run_latency_experiment(n_experiments=300):
+def run_latency_experiment(n_experiments=300, varredura=False):
     """
     Executa experimento de variação de requisitos de latência (10-200ms)
     para avaliar o número de servidores fog necessários por cada método.
     
     Args:
         n_experiments (int): Número de experimentos por método/topologia/latência
+        varredura (bool): Se True, cada heurística roda uma única vez por
+            amostra (com uma cloud sorteada por amostra, a mesma para todos os
+            L_max) e responde todos os L_max de uma vez com
+            varredura_requisitos.varre_latencia
     """
     
     print("=" * 80)
@@ -43,6 +48,13 @@ def run_latency_experiment(n_experiments=300):
         "Conectividade_Lat_Max": exp_conectividade_lat_max.solver,
         "Conectividade_Cap_Min": exp_conectividade_cap_min.solver
     }
+    # Nomes dos métodos em varredura_requisitos
+    metodos_varredura = {
+        "Excentricidade_Lat_max": "excentricidade_lat_min",
+        "Excentricidade_Cap_Min": "excentricidade_cap_max_v2",
+        "Conectividade_Lat_Max": "conectividade_lat_max",
+        "Conectividade_Cap_Min": "conectividade_cap_min"
+    }
     
     # Carregar dados das topologias
     print("Carregando dados das topologias...")
@@ -50,12 +62,12 @@ def run_latency_experiment(n_experiments=300):
     for topology_path in topologias_paths:
         print(f"  Carregando de: {topology_path}")
         try:
-            reader = datanetAPI.DatanetAPI(topology_path, [])
+            reader = datanetAPI.DatanetAPI(topology_path, [], detail="aggregate", cache_dir="./.datanet_cache")
             it_topo = iter(reader)
             samples = {
                 "lat": [],
                 "cap": [],
-                "dados": [],
+                "grafos": [],
                 "n_nodes": 0,
                 "actual_samples": 0
             }
@@ -66,7 +78,8 @@ def run_latency_experiment(n_experiments=300):
                     lat, cap = aux.extrai_latencias_capacidades(dados_sample)
                     samples["lat"].append(lat)
                     samples["cap"].append(cap)
-                    samples["dados"].append(dados_sample)
+                    # Os solvers de conectividade só precisam do grafo da topologia
+                    samples["grafos"].append(dados_sample.get_topology_object())
                     samples["actual_samples"] += 1
                 except StopIteration:
                     if sample_idx == 0:
@@ -74,6 +87,8 @@ def run_latency_experiment(n_experiments=300):
                     else:
                         print(f"    Aviso: Apenas {sample_idx} amostras encontradas")
                     break
+            # Fecha o arquivo tar.gz deixado aberto pelo iterador interrompido
+            reader.close()
             
             if samples["lat"]:
                 samples["n_nodes"] = len(samples["lat"][0])
@@ -108,31 +123,53 @@ def run_latency_experiment(n_experiments=300):
         # Usar primeira amostra para consistência
         latenciass = samples["lat"][0]
         capacidadess = samples["cap"][0]
-        dados = samples["dados"][0] if samples["dados"] else None
+        grafo = samples["grafos"][0] if samples["grafos"] else None
         n_nodes = samples["n_nodes"]
         
+        # No modo varredura, a inserção gulosa roda uma vez por método e
+        # amostra, e o número de fogs de cada L_max sai da mesma execução
+        fogs_varredura = {}
+        if varredura:
+            for method_name in experimentos_solvers:
+                fogs_varredura[method_name] = []
+                for exp_idx in range(min(n_experiments, samples["actual_samples"])):
+                    grafo = samples["grafos"][exp_idx] if samples["grafos"] else None
+                    if "Conectividade" in method_name and grafo is None:
+                        continue
+                    cloud_position = random.randint(0, samples["n_nodes"] - 1)
+                    try:
+                        _, _, fogs_inseridos = varredura_requisitos.varre_latencia(
+                            metodos_varredura[method_name], samples["lat"][exp_idx], samples["cap"][exp_idx],
+                            latency_range, fixed_capacity, L_cloud_fog, C_cloud_fog, cloud_position, grafo)
+                        fogs_varredura[method_name].append(fogs_inseridos)
+                    except Exception as e:
+                        print(f"    Erro em {method_name}, exp {exp_idx}: {e}")
+        
         # Testar cada requisito de latência
-        for L_max in latency_range:
+        for idx_lat, L_max in enumerate(latency_range):
             print(f"  Testando L_max = {L_max}ms")
             
             # Testar cada método heurístico
             for method_name, solver_func in experimentos_solvers.items():
                 fog_counts_for_latency = []
+                if varredura:
+                    fog_counts_for_latency = [int(fogs[idx_lat]) for fogs in fogs_varredura[method_name]]
                 
-                # Executar múltiplos experimentos para esta configuração
-                for exp_idx in range(min(n_experiments, samples["actual_samples"])):
+                # Executar múltiplos experimentos para esta configuração (no
+                # modo varredura, os fogs já foram calculados acima)
+                for exp_idx in range(0 if varredura else min(n_experiments, samples["actual_samples"])):
                     latenciass = samples["lat"][exp_idx]
                     capacidadess = samples["cap"][exp_idx]
-                    dados = samples["dados"][exp_idx] if samples["dados"] else None
+                    grafo = samples["grafos"][exp_idx] if samples["grafos"] else None
                     
                     cloud_position = random.randint(0, samples["n_nodes"] - 1)
                     solver_args = [latenciass, capacidadess, L_max, fixed_capacity, 
                                  L_cloud_fog, C_cloud_fog, cloud_position]
                     
-                    # Adicionar dados para métodos de conectividade
-                    if "Conectividade" in method_name and dados is not None:
-                        solver_args.append(dados)
-                    elif "Conectividade" in method_name and dados is None:
+                    # Adicionar o grafo para métodos de conectividade
+                    if "Conectividade" in method_name and grafo is not None:
+                        solver_args.append(grafo)
+                    elif "Conectividade" in method_name and grafo is None:
                         # Pular métodos de conectividade se não há dados disponíveis
                         continue
                     
@@ -88,12 +88,12 @@ topology_samples = {}
 for topology_path in topologias_paths:
     print(f"  Carregando de: {topology_path}")
     try:
-        reader = datanetAPI.DatanetAPI(topology_path, [])
+        reader = datanetAPI.DatanetAPI(topology_path, [], detail="aggregate", cache_dir="./.datanet_cache")
         it_topo = iter(reader)
         samples = {
             "lat": [],
             "cap": [],
-            "dados": [],
+            "grafos": [],
             "n_nodes": 0,
             "actual_samples": 0
         }
@@ -103,13 +103,16 @@ for topology_path in topologias_paths:
                 lat, cap = aux.extrai_latencias_capacidades(dados_sample)
                 samples["lat"].append(lat)
                 samples["cap"].append(cap)
-                samples["dados"].append(dados_sample)
+                # Os solvers de conectividade só precisam do grafo da topologia
+                samples["grafos"].append(dados_sample.get_topology_object())
             except StopIteration:
                 if k == 0:
                     print(f"    ERRO: Nenhuma amostra de dados encontrada em {topology_path}.")
                 else:
                     print(f"    Aviso: Apenas {k} amostras de dados encontradas (solicitado {n_simulacoes_por_config}).")
                 break
+        # Fecha o arquivo tar.gz deixado aberto pelo iterador interrompido
+        reader.close()
         if samples["lat"]:
             samples["n_nodes"] = len(samples["lat"][0])
             samples["actual_samples"] = len(samples["lat"])
@@ -137,7 +140,7 @@ for exp_name, solver_func in experimentos_solvers.items():
         try:
             sim_latenciass = samples["lat"]
             sim_capacidadess = samples["cap"]
-            sim_dadozes = samples["dados"]
+            sim_grafos = samples["grafos"]
             current_n_nodes = samples["n_nodes"]
             actual_samples_loaded = samples["actual_samples"]
 
@@ -164,10 +167,10 @@ for exp_name, solver_func in experimentos_solvers.items():
                     current_capacidades = sim_capacidadess[i]
                     solver_args = [current_latencias, current_capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, cloud_position]
                     if "Conectividade" in exp_name:
-                        if i < len(sim_dadozes):
-                            solver_args.append(sim_dadozes[i])
+                        if i < len(sim_grafos):
+                            solver_args.append(sim_grafos[i])
                         else:
-                            print(f"      ERROR: Missing 'dados' object for connectivity solver, sample {i}. Skipping this run.")
+                            print(f"      ERROR: Missing topology graph for connectivity solver, sample {i}. Skipping this run.")
                             continue
                     try:
                         # Time the heuristic solver execution
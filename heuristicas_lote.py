@@ -0,0 +1,214 @@
+"""
+Versões em lote das quatro heurísticas de posicionamento de fogs: recebem os
+tensores (S, N, N) de latências e capacidades de S amostras da mesma topologia
+(por exemplo, de aux.extrai_lote_latencias_capacidades) e a posição da cloud
+de cada amostra, e executam os passos gulosos de todas as amostras ao mesmo
+tempo, com operações NumPy mascaradas. Uma amostra que termina fica
+congelada enquanto as demais continuam.
+
+Para cada amostra o resultado é o mesmo do solver correspondente:
+    excentricidade_lat_min     -> exp_excentricidade_lat_min.solver
+    excentricidade_cap_max_v2  -> exp_excentricidade_cap_max_v2.solver
+    conectividade_lat_max      -> exp_conectividade_lat_max.solver
+    conectividade_cap_min      -> exp_conectividade_cap_min.solver
+
+todas_as_clouds usa o mesmo mecanismo para avaliar uma amostra com a cloud em
+cada um dos N nós, com um eixo de clouds à frente das matrizes.
+
+Uso:
+    lat, cap = aux.extrai_lote_latencias_capacidades(reader, 320)
+    clouds = np.random.randint(0, lat.shape[1], len(lat))
+    n_fogs, fogs, media = heuristicas_lote.excentricidade_lat_min(lat, cap, 15, 0.1, 100000, 25, clouds)
+
+    # Uma amostra, todas as posições da cloud
+    n_fogs, fogs, media = heuristicas_lote.todas_as_clouds(
+        heuristicas_lote.conectividade_lat_max, lat[0], cap[0], 15, 0.1, 100000, 25, grafo)
+"""
+import numpy as np
+from caracteristicas_topologia import caracteristicas_de
+from nucleo_heuristicas import AtribuicaoLote, soma_sobre_fogs, verifica_requisitos
+
+
+def excentricidade_lat_min(latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, clouds):
+    """
+    Heurística de excentricidade por latência para um lote de amostras.
+
+    Args:
+        latencias: Tensor (S, N, N) de latências
+        capacidades: Tensor (S, N, N) de capacidades
+        L_max, C_min, L_cloud_fog, C_cloud_fog: Requisitos, nas unidades dos
+            solvers (latências em ms)
+        clouds: Posição da cloud em cada amostra (vetor (S,) ou um inteiro)
+
+    Returns:
+        tuple: (n_fogs, fogs, media_latencia), com n_fogs (S,) o primeiro
+        valor retornado pelo solver, fogs a máscara (S, N) dos fogs (incluindo
+        a cloud) e media_latencia (S,) a latência média de cada amostra
+    """
+    lote = _Lote(latencias, capacidades, clouds)
+    candidatos = lote.coluna_cloud(lote.latencias) < lote.uni * L_cloud_fog
+    return _excentricidade(lote, lote.latencias, candidatos, L_max, C_min, L_cloud_fog, C_cloud_fog,
+                           maior=True, atribuicao=AtribuicaoLote(lote.latencias, lote.clouds))
+
+
+def excentricidade_cap_max_v2(latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, clouds):
+    """
+    Heurística de excentricidade por capacidade para um lote de amostras.
+    Argumentos e retorno como em excentricidade_lat_min.
+    """
+    lote = _Lote(latencias, capacidades, clouds)
+    candidatos = lote.coluna_cloud(lote.capacidades) > C_cloud_fog
+    atribuicao = AtribuicaoLote(lote.latencias, lote.clouds, autoatendimento=False, criterio=-lote.capacidades)
+    return _excentricidade(lote, lote.capacidades, candidatos, L_max, C_min, L_cloud_fog, C_cloud_fog,
+                           maior=False, atribuicao=atribuicao)
+
+
+def conectividade_lat_max(latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, clouds, dados):
+    """
+    Heurística de conectividade por latência para um lote de amostras.
+
+    Args:
+        dados: Sample, grafo networkx ou CaracteristicasTopologia da topologia
+            (a mesma para todas as amostras)
+
+    Demais argumentos e retorno como em excentricidade_lat_min.
+    """
+    lote = _Lote(latencias, capacidades, clouds)
+    ordem = _ordem_por_grau(lote, dados, lote.coluna_cloud(lote.latencias), decrescente=True)
+    return _conectividade(lote, ordem, L_max, C_min, L_cloud_fog, C_cloud_fog)
+
+
+def conectividade_cap_min(latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, clouds, dados):
+    """
+    Heurística de conectividade por capacidade para um lote de amostras.
+    Argumentos e retorno como em conectividade_lat_max.
+    """
+    lote = _Lote(latencias, capacidades, clouds)
+    ordem = _ordem_por_grau(lote, dados, lote.coluna_cloud(lote.capacidades), decrescente=False)
+    return _conectividade(lote, ordem, L_max, C_min, L_cloud_fog, C_cloud_fog)
+
+
+def todas_as_clouds(heuristica, latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, dados=None):
+    """
+    Avalia uma amostra com a cloud em cada um dos N nós de uma vez: as
+    matrizes (N, N) são repetidas, sem cópia, em um eixo de clouds e
+    resolvidas como um lote de N amostras.
+
+    Args:
+        heuristica: Uma das funções deste módulo (por exemplo,
+            excentricidade_lat_min)
+        latencias, capacidades: Matrizes (N, N) de uma amostra
+        L_max, C_min, L_cloud_fog, C_cloud_fog: Requisitos, como nos solvers
+        dados: Topologia, só para as heurísticas de conectividade
+
+    Returns:
+        tuple: (n_fogs, fogs, media_latencia), com forma (N,), (N, N) e (N,),
+        indexados pela posição da cloud
+    """
+    latencias = np.asarray(latencias, dtype=np.float64)
+    capacidades = np.asarray(capacidades, dtype=np.float64)
+    n_nodes = len(latencias)
+    forma = (n_nodes, n_nodes, n_nodes)
+    args = [np.broadcast_to(latencias, forma), np.broadcast_to(capacidades, forma),
+            L_max, C_min, L_cloud_fog, C_cloud_fog, np.arange(n_nodes)]
+    if dados is not None:
+        args.append(dados)
+    return heuristica(*args)
+
+
+class _Lote:
+    """Tensores e posições da cloud de um lote, já validados."""
+
+    uni = 0.025/2
+
+    def __init__(self, latencias, capacidades, clouds):
+        self.latencias = np.asarray(latencias, dtype=np.float64)
+        self.capacidades = np.asarray(capacidades, dtype=np.float64)
+        if self.latencias.ndim != 3 or self.latencias.shape != self.capacidades.shape:
+            raise ValueError(f"Esperados dois tensores (S, N, N) de mesma forma: {self.latencias.shape} e {self.capacidades.shape}")
+        self.n_amostras, self.n_nodes = self.latencias.shape[:2]
+        self.clouds = np.broadcast_to(np.asarray(clouds, dtype=np.int64), (self.n_amostras,)).copy()
+        self.amostras = np.arange(self.n_amostras)
+
+    def coluna_cloud(self, matriz):
+        # matriz[s, :, clouds[s]] para cada amostra s
+        return matriz[self.amostras, :, self.clouds]
+
+    def requisitos(self, atribuicao, L_max, C_min, L_cloud_fog, C_cloud_fog):
+        return verifica_requisitos(self.latencias, self.capacidades, atribuicao.atribuido, atribuicao.fogs,
+                                   self.clouds, self.uni*L_max, C_min, self.uni*L_cloud_fog, C_cloud_fog)
+
+
+def _excentricidade(lote, matriz, candidatos, L_max, C_min, L_cloud_fog, C_cloud_fog, maior, atribuicao):
+    # A cloud não é candidata; a pontuação inicial é a coluna da cloud
+    candidatos[lote.amostras, lote.clouds] = False
+    pontuacao = lote.coluna_cloud(matriz).copy()
+    n_fogs = np.zeros(lote.n_amostras, dtype=np.int64)
+    ativas = np.ones(lote.n_amostras, dtype=bool)
+    while True:
+        atendidos = lote.requisitos(atribuicao, L_max, C_min, L_cloud_fog, C_cloud_fog).all(axis=1)
+        # Como nos solvers, a falta de candidatos é testada antes dos requisitos
+        sem_candidatos = ativas & ~candidatos.any(axis=1)
+        n_fogs[sem_candidatos] = lote.n_nodes
+        concluidas = ativas & ~sem_candidatos & atendidos
+        n_fogs[concluidas] = atribuicao.fogs[concluidas].sum(axis=1) - 1
+        ativas &= ~(sem_candidatos | concluidas)
+        if not ativas.any():
+            break
+        amostras = np.flatnonzero(ativas)
+        # Próximo fog: maior pontuação (empate, maior índice) ou menor
+        # pontuação (empate, menor índice), como nos solvers
+        if maior:
+            valores = np.where(candidatos[amostras], pontuacao[amostras], -np.inf)
+            fogs = lote.n_nodes - 1 - np.argmax(valores[:, ::-1], axis=1)
+        else:
+            valores = np.where(candidatos[amostras], pontuacao[amostras], np.inf)
+            fogs = np.argmin(valores, axis=1)
+        candidatos[amostras, fogs] = False
+        atribuicao.adiciona(amostras, fogs)
+        # Pontuação recalculada na ordem dos índices, como nos solvers
+        pontuacao[amostras] = soma_sobre_fogs(matriz[amostras], atribuicao.fogs[amostras])
+    return n_fogs, atribuicao.fogs, atribuicao.latencia_media()
+
+
+def _ordem_por_grau(lote, dados, desempate, decrescente):
+    """
+    nucleo_heuristicas.ordem_por_grau para cada amostra: ordem (S, N-1) de
+    inserção dos fogs, sem a cloud de cada amostra.
+    """
+    graus = caracteristicas_de(dados).grau
+    grau = np.zeros(lote.n_nodes)
+    posicao = np.zeros(lote.n_nodes)
+    for k, no in enumerate(graus):
+        grau[no] = graus[no]
+        posicao[no] = k
+    grau = np.broadcast_to(grau, desempate.shape)
+    if decrescente:
+        grau, desempate = -grau, -desempate
+    # A cloud vai para o fim da ordem e é descartada
+    e_cloud = np.zeros(desempate.shape)
+    e_cloud[lote.amostras, lote.clouds] = 1
+    ordem = np.lexsort((np.broadcast_to(posicao, desempate.shape), desempate, grau, e_cloud), axis=-1)
+    return ordem[:, :lote.n_nodes - 1]
+
+
+def _conectividade(lote, ordem, L_max, C_min, L_cloud_fog, C_cloud_fog):
+    atribuicao = AtribuicaoLote(lote.latencias, lote.clouds)
+    n_fogs = np.zeros(lote.n_amostras, dtype=np.int64)
+    ativas = np.ones(lote.n_amostras, dtype=bool)
+    # Todas as amostras ativas inserem um fog por passo, então o cursor na
+    # ordem é o mesmo para todas
+    proximo = 0
+    while True:
+        atendidos = lote.requisitos(atribuicao, L_max, C_min, L_cloud_fog, C_cloud_fog).all(axis=1)
+        concluidas = ativas & atendidos
+        n_fogs[concluidas] = atribuicao.fogs[concluidas].sum(axis=1) - 1
+        esgotadas = ativas & ~atendidos & (atribuicao.fogs.sum(axis=1) >= lote.n_nodes)
+        n_fogs[esgotadas] = lote.n_nodes
+        ativas &= ~(concluidas | esgotadas)
+        if not ativas.any():
+            break
+        amostras = np.flatnonzero(ativas)
+        atribuicao.adiciona(amostras, ordem[amostras, proximo])
+        proximo += 1
+    return n_fogs, atribuicao.fogs, atribuicao.latencia_media()
@@ -0,0 +1,160 @@
+"""
+Publica os tensores (S, N, N) de latência e capacidade de uma topologia em
+memória compartilhada (multiprocessing.shared_memory), para que processos
+trabalhadores os leiam sem cópia: cada tarefa recebe só um descritor pequeno
+(nome do bloco, forma e dtype) em vez de listas de floats e objetos Sample.
+
+Uso:
+    lat, cap = aux.extrai_lote_latencias_capacidades(reader, 320)
+    descritor, bloco = publica_tensores(lat, cap)
+    try:
+        with ProcessPoolExecutor() as executor:
+            executor.map(tarefa, [(descritor, k) for k in range(len(lat))])
+    finally:
+        libera_tensores(bloco)
+
+    def tarefa(args):
+        descritor, k = args
+        latencias, capacidades = anexa_tensores(descritor)
+        ...
+"""
+import atexit
+import threading
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+# Blocos publicados por este processo, por nome
+_publicados = {}
+# Blocos já anexados neste processo, reaproveitados pelas tarefas seguintes
+_anexados = {}
+# Serializa a troca temporária de resource_tracker.register em _anexa
+_trava_registro = threading.Lock()
+
+
+def publica_tensores(latencias, capacidades):
+    """
+    Copia latencias e capacidades para um único bloco de memória
+    compartilhada.
+
+    Args:
+        latencias (ndarray): Tensor (S, N, N) de latências
+        capacidades (ndarray): Tensor de capacidades com a mesma forma
+
+    Returns:
+        tuple: (descritor, bloco). O descritor é um dicionário que pode ser
+        enviado aos trabalhadores; o bloco deve ser mantido pelo processo que
+        publicou até o fim das tarefas e então passado a libera_tensores
+    """
+    latencias = np.asarray(latencias)
+    capacidades = np.asarray(capacidades, dtype=latencias.dtype)
+    if latencias.shape != capacidades.shape:
+        raise ValueError(f"Formas diferentes: {latencias.shape} e {capacidades.shape}")
+    tamanho = max(latencias.nbytes, 1)
+    bloco = shared_memory.SharedMemory(create=True, size=2 * tamanho)
+    descritor = {
+        "nome": bloco.name,
+        "shape": latencias.shape,
+        "dtype": latencias.dtype.str,
+        "offset_capacidades": tamanho
+    }
+    destino_lat, destino_cap = _visoes(bloco, descritor)
+    destino_lat[...] = latencias
+    destino_cap[...] = capacidades
+    _publicados[bloco.name] = bloco
+    return descritor, bloco
+
+
+def anexa_tensores(descritor):
+    """
+    Anexa o bloco publicado por publica_tensores e retorna visões somente
+    leitura dos tensores, sem copiar os dados. O bloco fica anexado enquanto o
+    processo viver, para as próximas tarefas com o mesmo descritor.
+
+    Returns:
+        tuple: (latencias, capacidades)
+    """
+    anexado = _anexados.get(descritor["nome"])
+    if anexado is None and descritor["nome"] in _publicados:
+        # Tarefa executada no próprio processo que publicou
+        latencias, capacidades = _visoes(_publicados[descritor["nome"]], descritor)
+        latencias.flags.writeable = False
+        capacidades.flags.writeable = False
+        anexado = _anexados[descritor["nome"]] = (None, latencias, capacidades)
+    elif anexado is None:
+        bloco = _anexa(descritor["nome"])
+        latencias, capacidades = _visoes(bloco, descritor)
+        latencias.flags.writeable = False
+        capacidades.flags.writeable = False
+        anexado = _anexados[descritor["nome"]] = (bloco, latencias, capacidades)
+    return anexado[1], anexado[2]
+
+
+def desanexa_tensores(descritor):
+    """
+    Fecha o bloco anexado por anexa_tensores neste processo. As visões
+    retornadas por ele não podem mais estar em uso.
+    """
+    anexado = _anexados.pop(descritor["nome"], None)
+    if anexado is not None and anexado[0] is not None:
+        bloco = anexado[0]
+        del anexado
+        bloco.close()
+
+
+def libera_tensores(bloco):
+    """
+    Remove e fecha o bloco criado por publica_tensores. As visões obtidas
+    com anexa_tensores neste processo não podem mais estar em uso.
+    """
+    _anexados.pop(bloco.name, None)
+    _publicados.pop(bloco.name, None)
+    bloco.unlink()
+    bloco.close()
+
+
+@atexit.register
+def _desanexa_todos():
+    # Fecha os blocos anexados antes da finalização do interpretador, que
+    # tentaria fechá-los com as visões ainda vivas
+    for nome in list(_anexados):
+        try:
+            desanexa_tensores({"nome": nome})
+        except BufferError:
+            pass
+
+
+def _anexa(nome):
+    """
+    Anexa o bloco nome sem registrá-lo no resource_tracker: só o processo que
+    publicou deve removê-lo.
+    """
+    try:
+        return shared_memory.SharedMemory(name=nome, track=False)
+    except TypeError:
+        pass
+    # Antes do Python 3.13 anexar sempre registra o bloco. Com spawn e
+    # forkserver o resource_tracker é o mesmo do processo que publicou, e um
+    # unregister depois de anexar apagaria o registro dele; por isso o
+    # registro é evitado durante a anexação
+    with _trava_registro:
+        registra = resource_tracker.register
+
+        def registra_exceto_memoria(name, rtype):
+            if rtype != "shared_memory":
+                registra(name, rtype)
+
+        resource_tracker.register = registra_exceto_memoria
+        try:
+            return shared_memory.SharedMemory(name=nome)
+        finally:
+            resource_tracker.register = registra
+
+
+def _visoes(bloco, descritor):
+    shape = tuple(descritor["shape"])
+    dtype = np.dtype(descritor["dtype"])
+    count = int(np.prod(shape))
+    latencias = np.frombuffer(bloco.buf, dtype=dtype, count=count).reshape(shape)
+    capacidades = np.frombuffer(bloco.buf, dtype=dtype, count=count,
+                                offset=descritor["offset_capacidades"]).reshape(shape)
+    return latencias, capacidades
@@ -0,0 +1,309 @@
+"""
+Estruturas compartilhadas pelas heurísticas de posicionamento de fogs.
+
+AtribuicaoIncremental mantém, para cada nó, o fog que o atende e a latência
+até ele. Inserir um fog atualiza todos os nós com uma única operação sobre a
+coluna do novo fog (O(N)), em vez de reconstruir a matriz de atendimento y
+(O(N²)) a cada passo, com o mesmo resultado:
+    - um nó que é fog atende a si mesmo;
+    - os demais são atendidos pelo fog de menor latência e, em caso de
+      empate, pelo de menor índice (a ordem do min sobre o dicionário
+      {k: latencias[i][k]} dos solvers).
+Com outro critério (por exemplo, -capacidades), o mesmo mecanismo atribui cada
+nó ao fog de maior capacidade.
+
+verifica_requisitos avalia os requisitos de todos os nós de uma vez, a partir
+do vetor de atribuição e da máscara de fogs. AtribuicaoLote e
+verifica_requisitos também operam sobre lotes de amostras (S, N, N), usados
+por heuristicas_lote.
+"""
+import numpy as np
+
+
+class AtribuicaoIncremental:
+    """
+    Atendimento de cada nó pelo fog mais próximo, atualizado a cada fog
+    inserido.
+
+    Atributos:
+        latencias (ndarray): Matriz (N, N) de latências
+        criterio (ndarray): Matriz (N, N) minimizada na atribuição
+        fogs (ndarray): Máscara booleana dos nós que são fogs
+        atribuido (ndarray): Índice do fog que atende cada nó
+        melhor (ndarray): Critério de cada nó até o fog que o atende (a
+            latência, com o critério padrão)
+    """
+
+    def __init__(self, latencias, fogs_iniciais, autoatendimento=True, criterio=None):
+        """
+        Args:
+            latencias: Matriz (N, N) de latências (listas ou ndarray)
+            fogs_iniciais (iterable): Nós que já são fogs
+            autoatendimento (bool): Se True, cada fog atende a si mesmo; se
+                False, os fogs também são atendidos pelo fog mais próximo
+            criterio: Matriz (N, N) minimizada na escolha do fog de cada nó
+                (padrão: as latências)
+        """
+        self.latencias = np.asarray(latencias, dtype=np.float64)
+        self.criterio = self.latencias if criterio is None else np.asarray(criterio, dtype=np.float64)
+        n_nodes = len(self.latencias)
+        self.autoatendimento = autoatendimento
+        self.fogs = np.zeros(n_nodes, dtype=bool)
+        self.atribuido = np.full(n_nodes, -1, dtype=np.int64)
+        self.melhor = np.full(n_nodes, np.inf)
+        for fog in sorted(fogs_iniciais):
+            self.adiciona(fog)
+
+    def adiciona(self, fog):
+        """
+        Insere o fog e reatribui os nós para os quais ele passa a ser o mais
+        próximo.
+        """
+        coluna = self.criterio[:, fog]
+        # Empates ficam com o fog de menor índice
+        troca = (coluna < self.melhor) | ((coluna == self.melhor) & (fog < self.atribuido)) | (self.atribuido < 0)
+        if self.autoatendimento:
+            troca &= ~self.fogs
+        self.atribuido[troca] = fog
+        self.melhor[troca] = coluna[troca]
+        self.fogs[fog] = True
+        if self.autoatendimento:
+            self.atribuido[fog] = fog
+            self.melhor[fog] = coluna[fog]
+
+    def latencia_media(self):
+        """
+        Latência média entre cada nó e o fog que o atende, somada na ordem
+        dos nós como o laço sobre y dos solvers.
+        """
+        n_nodes = len(self.melhor)
+        if n_nodes == 0:
+            return 0
+        latencias = self.latencias[np.arange(n_nodes), self.atribuido]
+        total = float(np.cumsum(latencias)[-1])
+        return total / n_nodes
+
+
+class AtribuicaoLote:
+    """
+    AtribuicaoIncremental para um lote de S amostras da mesma topologia, em
+    que cada amostra insere o seu próprio fog a cada passo.
+
+    Atributos:
+        latencias (ndarray): Tensor (S, N, N) de latências
+        criterio (ndarray): Tensor (S, N, N) minimizado na atribuição
+        fogs (ndarray): Máscara (S, N) dos nós que são fogs
+        atribuido (ndarray): Índice (S, N) do fog que atende cada nó
+        melhor (ndarray): Critério (S, N) de cada nó até o fog que o atende
+    """
+
+    def __init__(self, latencias, fogs_iniciais, autoatendimento=True, criterio=None):
+        """
+        Args:
+            latencias: Tensor (S, N, N) de latências
+            fogs_iniciais: Vetor (S,) com o fog inicial (a cloud) de cada amostra
+            autoatendimento (bool): Como em AtribuicaoIncremental
+            criterio: Tensor (S, N, N) minimizado na escolha do fog de cada nó
+                (padrão: as latências)
+        """
+        self.latencias = np.asarray(latencias, dtype=np.float64)
+        self.criterio = self.latencias if criterio is None else np.asarray(criterio, dtype=np.float64)
+        n_amostras, n_nodes = self.latencias.shape[:2]
+        self.autoatendimento = autoatendimento
+        self.fogs = np.zeros((n_amostras, n_nodes), dtype=bool)
+        self.atribuido = np.full((n_amostras, n_nodes), -1, dtype=np.int64)
+        self.melhor = np.full((n_amostras, n_nodes), np.inf)
+        fogs_iniciais = np.broadcast_to(np.asarray(fogs_iniciais, dtype=np.int64), (n_amostras,))
+        self.adiciona(np.arange(n_amostras), fogs_iniciais)
+
+    def adiciona(self, amostras, fogs):
+        """
+        Insere fogs[k] na amostra amostras[k], para cada k.
+
+        Args:
+            amostras (ndarray): Índices das amostras, sem repetição
+            fogs (ndarray): Fog inserido em cada uma delas
+        """
+        linhas = np.arange(len(amostras))
+        coluna = self.criterio[amostras, :, fogs]
+        melhor = self.melhor[amostras]
+        atribuido = self.atribuido[amostras]
+        # Empates ficam com o fog de menor índice
+        troca = (coluna < melhor) | ((coluna == melhor) & (fogs[:, None] < atribuido)) | (atribuido < 0)
+        if self.autoatendimento:
+            troca &= ~self.fogs[amostras]
+        atribuido = np.where(troca, fogs[:, None], atribuido)
+        melhor = np.where(troca, coluna, melhor)
+        if self.autoatendimento:
+            atribuido[linhas, fogs] = fogs
+            melhor[linhas, fogs] = coluna[linhas, fogs]
+        self.fogs[amostras, fogs] = True
+        self.atribuido[amostras] = atribuido
+        self.melhor[amostras] = melhor
+
+    def latencia_media(self):
+        """
+        Latência média (S,) entre cada nó e o fog que o atende, somada na
+        ordem dos nós como em AtribuicaoIncremental.
+        """
+        n_amostras, n_nodes = self.atribuido.shape
+        if n_nodes == 0:
+            return np.zeros(n_amostras)
+        latencias = _coluna(self.latencias, self.atribuido[..., None])
+        return np.cumsum(latencias, axis=1)[:, -1] / n_nodes
+
+
+def soma_sobre_fogs(matriz, fogs):
+    """
+    Soma de cada linha de matriz sobre as colunas dos fogs, como o
+    sum(np.array(linha) * np.array(fogs)) dos solvers originais: os N termos
+    (zero fora dos fogs) acumulados um a um na ordem dos índices, com um
+    cumsum, para que as pontuações e os empates sejam os mesmos bit a bit.
+
+    Args:
+        matriz: Linhas (..., M, N) da matriz de latências ou capacidades
+        fogs: Máscara (..., N) dos fogs
+
+    Returns:
+        ndarray: Pontuações (..., M)
+    """
+    termos = matriz * np.asarray(fogs)[..., None, :]
+    if termos.shape[-1] == 0:
+        return termos.sum(axis=-1)
+    return np.cumsum(termos, axis=-1)[..., -1]
+
+
+class PontuacaoIncremental:
+    """
+    Pontuação de excentricidade dos candidatos a fog: a soma da linha do
+    candidato na matriz (latências ou capacidades) sobre os fogs atuais.
+    Inserir um fog atualiza a máscara dos fogs e recalcula, vetorizado, só
+    as linhas dos candidatos restantes, na ordem dos índices
+    (soma_sobre_fogs), em vez de sum(np.array(linha) * np.array(fogs)) em
+    Python para cada um.
+
+    Atributos:
+        matriz (ndarray): Matriz (N, N) usada na pontuação
+        candidatos (ndarray): Máscara booleana dos candidatos restantes
+        fogs (ndarray): Máscara booleana dos fogs
+        pontuacao (ndarray): Pontuação atual de cada nó
+    """
+
+    def __init__(self, matriz, candidatos, fogs_iniciais):
+        """
+        Args:
+            matriz: Matriz (N, N) de latências ou capacidades
+            candidatos (iterable): Nós que podem receber um fog
+            fogs_iniciais (iterable): Nós que já são fogs
+        """
+        self.matriz = np.asarray(matriz, dtype=np.float64)
+        n_nodes = len(self.matriz)
+        self.candidatos = np.zeros(n_nodes, dtype=bool)
+        self.candidatos[list(candidatos)] = True
+        self.fogs = np.zeros(n_nodes, dtype=bool)
+        self.fogs[list(fogs_iniciais)] = True
+        self.pontuacao = soma_sobre_fogs(self.matriz, self.fogs)
+
+    def restantes(self):
+        """Retorna True se ainda houver candidatos."""
+        return bool(self.candidatos.any())
+
+    def maior(self):
+        """
+        Candidato de maior pontuação; em caso de empate, o de maior índice
+        (o max por (pontuacao, k) dos solvers).
+        """
+        valores = np.where(self.candidatos, self.pontuacao, -np.inf)
+        return int(len(valores) - 1 - np.argmax(valores[::-1]))
+
+    def menor(self):
+        """
+        Candidato de menor pontuação; em caso de empate, o de menor índice
+        (o min por (pontuacao, k) dos solvers).
+        """
+        valores = np.where(self.candidatos, self.pontuacao, np.inf)
+        return int(np.argmin(valores))
+
+    def adiciona(self, fog):
+        """Remove o fog dos candidatos e recalcula a pontuação dos restantes."""
+        self.candidatos[fog] = False
+        self.fogs[fog] = True
+        self.pontuacao[self.candidatos] = soma_sobre_fogs(self.matriz[self.candidatos], self.fogs)
+
+
+def ordem_por_grau(graus, desempate, excluido, decrescente):
+    """
+    Ordem de inserção dos fogs das heurísticas de conectividade, calculada
+    uma única vez com um lexsort: os nós ordenados pelo grau e, em empate,
+    pelo critério de desempate, ambos decrescentes ou ambos crescentes. Em
+    empate nos dois, vale a ordem do grafo, como no sorted estável dos
+    solvers (inclusive com reverse=True).
+
+    Args:
+        graus (dict): Grau de cada nó, na ordem do grafo
+        desempate: Vetor (N,) com o critério de desempate de cada nó
+        excluido: Nó que não entra na ordem (a cloud)
+        decrescente (bool): Se True, maior grau primeiro
+
+    Returns:
+        ndarray: Nós na ordem em que recebem um fog
+    """
+    nos = np.array([no for no in graus if no != excluido], dtype=np.int64)
+    grau = np.array([graus[no] for no in nos], dtype=np.float64)
+    chave = np.asarray(desempate, dtype=np.float64)[nos]
+    if decrescente:
+        grau, chave = -grau, -chave
+    return nos[np.lexsort((np.arange(len(nos)), chave, grau))]
+
+
+def verifica_requisitos(latencias, capacidades, atribuido, fogs, cloud, L_max, C_min, L_cloud_fog, C_cloud_fog):
+    """
+    Avalia os requisitos de todos os nós de uma vez: um fog é atendido se a
+    latência até a cloud for menor que L_cloud_fog e a capacidade maior que
+    C_cloud_fog; os demais nós, se a latência até o fog que os atende for
+    menor que L_max e a capacidade maior que C_min.
+
+    Também aceita lotes: matrizes (S, N, N), atribuido e fogs (S, N) e cloud
+    (S,), com requisitos escalares ou que façam broadcast para (S, N).
+
+    Args:
+        latencias (ndarray): Matriz (N, N) de latências
+        capacidades (ndarray): Matriz (N, N) de capacidades
+        atribuido (ndarray): Índice do fog que atende cada nó
+        fogs (ndarray): Máscara booleana dos nós que são fogs
+        cloud (int): Nó da cloud
+        L_max, C_min, L_cloud_fog, C_cloud_fog: Requisitos, já nas unidades
+            das matrizes
+
+    Returns:
+        ndarray: Máscara booleana dos nós atendidos
+    """
+    atribuido = np.asarray(atribuido)[..., None]
+    cloud = np.broadcast_to(np.asarray(cloud)[..., None, None], atribuido.shape)
+    return np.where(fogs,
+                    (_coluna(latencias, cloud) < L_cloud_fog) & (_coluna(capacidades, cloud) > C_cloud_fog),
+                    (_coluna(latencias, atribuido) < L_max) & (_coluna(capacidades, atribuido) > C_min))
+
+
+def _coluna(matriz, indices):
+    # matriz[..., i, indices[..., i, 0]] para cada nó i
+    return np.take_along_axis(matriz, indices, axis=-1)[..., 0]
+
+
+def descreve_atendimento(latencias, atribuido, fogs, cloud, atendidos):
+    """
+    Descreve o atendimento de cada nó, para diagnóstico.
+
+    Returns:
+        list: Uma frase por nó
+    """
+    frases = []
+    for i, (servidor, fog, atendido) in enumerate(zip(atribuido.tolist(), fogs.tolist(), atendidos.tolist())):
+        negacao = "" if atendido else "não "
+        if fog:
+            lat = latencias[i, cloud].item()
+            frases.append(f"O nó de fog {i} {negacao}é atendido pelo nó de cloud {cloud} com latência {lat}")
+        else:
+            lat = latencias[i, servidor].item()
+            frases.append(f"O nó {i} {negacao}é atendido pelo nó de fog {servidor} com latência {lat}")
+    return frases
@@ -0,0 +1,130 @@
+"""
+Pipeline em fluxo entre o DatanetAPI e os solvers: uma thread leitora
+descompacta e decodifica as amostras e as coloca em uma fila limitada, de onde
+os solvers as consomem. A memória usada fica limitada à profundidade da fila,
+em vez de todas as amostras de todas as topologias, e a leitura dos arquivos
+tar.gz se sobrepõe à execução dos solvers.
+
+Uso:
+    reader = datanetAPI.DatanetAPI(topology_path, [], detail="aggregate")
+    for sample_id, lat, cap, grafo in fluxo_amostras(reader, 400):
+        resultado = exp_excentricidade_lat_min.solver(lat, cap, ...)
+"""
+import threading
+import queue
+import collections
+import itertools
+import aux_functions as aux
+
+PROFUNDIDADE_FILA = 16
+
+_FIM = object()
+
+
+class _Falha:
+    """Exceção levantada na thread leitora, repassada ao consumidor."""
+
+    def __init__(self, erro):
+        self.erro = erro
+
+
+def _coloca(fila, item, parar):
+    """
+    Coloca item na fila, esperando haver espaço. Retorna False se o consumidor
+    desistiu do fluxo nesse meio tempo.
+    """
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def fluxo_amostras(reader, max_amostras=None, profundidade=PROFUNDIDADE_FILA):
+    """
+    Gera as amostras do reader já convertidas para o formato dos solvers,
+    lidas por uma thread em segundo plano que fica no máximo profundidade
+    amostras à frente do consumidor.
+
+    Args:
+        reader (DatanetAPI): Leitor da topologia
+        max_amostras (int): Número máximo de amostras geradas (padrão: todas)
+        profundidade (int): Tamanho máximo da fila entre a leitura e o consumo
+
+    Yields:
+        tuple: (sample_id, latencias, capacidades, grafo), com sample_id a
+        posição da amostra no fluxo e latencias/capacidades como retornadas
+        por aux.extrai_latencias_capacidades
+    """
+    # A ordem dos arquivos tar é sorteada aqui, na thread principal, para
+    # consumir o estado global do random como a leitura sequencial
+    topologias = reader.topology_iterators()
+    fila = queue.Queue(maxsize=profundidade)
+    parar = threading.Event()
+
+    def produz():
+        amostras = itertools.chain.from_iterable(topologias)
+        try:
+            # islice para antes de pedir a amostra seguinte, sem ler outro tar
+            for sample_id, dados in enumerate(itertools.islice(amostras, max_amostras)):
+                lat, cap = aux.extrai_latencias_capacidades(dados)
+                if not _coloca(fila, (sample_id, lat, cap, dados.get_topology_object()), parar):
+                    return
+        except BaseException as e:
+            _coloca(fila, _Falha(e), parar)
+            return
+        finally:
+            for topologia in topologias:
+                topologia.close()
+        _coloca(fila, _FIM, parar)
+
+    leitora = threading.Thread(target=produz, name="fluxo_amostras", daemon=True)
+    leitora.start()
+    try:
+        while True:
+            item = fila.get()
+            if item is _FIM:
+                break
+            if isinstance(item, _Falha):
+                raise item.erro
+            yield item
+    finally:
+        parar.set()
+        leitora.join()
+
+
+def resolve_em_fluxo(itens, tarefa, executor=None, profundidade=PROFUNDIDADE_FILA):
+    """
+    Aplica tarefa a cada item de itens (por exemplo, os gerados por
+    fluxo_amostras), gerando os resultados na ordem dos itens.
+
+    Args:
+        itens (iterable): Itens a resolver
+        tarefa (callable): Função chamada como tarefa(item)
+        executor (Executor): Se dado, as tarefas são submetidas a ele, com no
+            máximo profundidade tarefas em andamento; senão são executadas na
+            thread atual, enquanto a thread leitora segue descompactando
+        profundidade (int): Número máximo de tarefas em andamento no executor
+
+    Yields:
+        tuple: (item, resultado)
+    """
+    if executor is None:
+        for item in itens:
+            yield item, tarefa(item)
+        return
+    pendentes = collections.deque()
+    try:
+        for item in itens:
+            pendentes.append((item, executor.submit(tarefa, item)))
+            if len(pendentes) >= profundidade:
+                item, futuro = pendentes.popleft()
+                yield item, futuro.result()
+        while pendentes:
+            item, futuro = pendentes.popleft()
+            yield item, futuro.result()
+    finally:
+        for _, futuro in pendentes:
+            futuro.cancel()
@@ -71,7 +71,7 @@ topology_samples = {}
 for topology_path in topologias_paths:
     print(f"  Carregando de: {topology_path}")
     try:
-        reader = datanetAPI.DatanetAPI(os.path.join(CURRENT_DIR, topology_path), [])
+        reader = datanetAPI.DatanetAPI(os.path.join(CURRENT_DIR, topology_path), [], detail="aggregate")
         it_topo = iter(reader)
         samples = {
             "lat": [],
@@ -96,6 +96,8 @@ for topology_path in topologias_paths:
                 else:
                     print(f"    Aviso: Apenas {k} amostras de dados encontradas (solicitado {n_simulacoes_por_config}).")
                 break
+        # Fecha o arquivo tar.gz deixado aberto pelo iterador interrompido
+        reader.close()
         if samples["lat"]:
             samples["n_nodes"] = len(samples["lat"][0])
             samples["actual_samples"] = len(samples["lat"])
@@ -0,0 +1,196 @@
+"""
+Varredura de requisitos em uma única execução das heurísticas.
+
+A ordem em que as heurísticas inserem os fogs não depende de L_max nem de
+C_min: só o ponto de parada depende. trajetoria executa a inserção gulosa uma
+vez, até o fim, e registra após cada inserção a maior latência e a menor
+capacidade entre os nós que não são fogs e o fog que os atende. O solver para
+no primeiro passo em que latencia_max < L_max e capacidade_min > C_min (e os
+fogs atendem ao requisito até a cloud), então uma grade inteira de requisitos
+é respondida a partir da mesma trajetória.
+
+Uso:
+    grade = np.arange(10, 201, 5)
+    n_fogs, media, inseridos = varre_latencia("excentricidade_lat_min", lat, cap, grade, 0.1, 100000, 25, cloud)
+    n_fogs, media, inseridos = varre_capacidade("conectividade_cap_min", lat, cap, 70, np.linspace(0, 10, 41),
+                                                100000, 25, cloud, grafo)
+"""
+import numpy as np
+from caracteristicas_topologia import caracteristicas_de
+from nucleo_heuristicas import AtribuicaoIncremental, PontuacaoIncremental, ordem_por_grau
+
+# Heurísticas aceitas, com os nomes das funções de heuristicas_lote
+METODOS = ("excentricidade_lat_min", "excentricidade_cap_max_v2", "conectividade_lat_max", "conectividade_cap_min")
+
+
+class Trajetoria:
+    """
+    Estado de uma heurística após cada inserção de fog (passo k = número de
+    fogs inseridos além da cloud).
+
+    Atributos:
+        inseridos (list): Fogs na ordem de inserção
+        fogs_atendidos (ndarray): (K+1,) True se todos os fogs atendem ao
+            requisito até a cloud no passo k
+        latencia_max (ndarray): (K+1,) Maior latência entre um nó que não é
+            fog e o fog que o atende (-inf se todos forem fogs)
+        capacidade_min (ndarray): (K+1,) Menor capacidade entre um nó que não
+            é fog e o fog que o atende (inf se todos forem fogs)
+        media_latencia (ndarray): (K+1,) Latência média da rede no passo k
+        testa_ultimo (bool): Se os requisitos também são testados no último
+            passo (conectividade); nas heurísticas de excentricidade, a falta
+            de candidatos encerra o solver antes do teste
+        n_nodes (int): Número de nós
+    """
+
+    def __init__(self, n_nodes, testa_ultimo):
+        self.n_nodes = n_nodes
+        self.testa_ultimo = testa_ultimo
+        self.inseridos = []
+        self._passos = []
+
+    def _registra(self, latencias, capacidades, atendimento, fog_atendido):
+        indices = np.arange(self.n_nodes)
+        nao_fogs = ~atendimento.fogs
+        self._passos.append((
+            bool(fog_atendido[atendimento.fogs].all()),
+            latencias[indices, atendimento.atribuido][nao_fogs].max(initial=-np.inf),
+            capacidades[indices, atendimento.atribuido][nao_fogs].min(initial=np.inf),
+            atendimento.latencia_media()
+        ))
+
+    def _fecha(self):
+        fogs_atendidos, latencia_max, capacidade_min, media_latencia = zip(*self._passos)
+        self.fogs_atendidos = np.array(fogs_atendidos)
+        self.latencia_max = np.array(latencia_max)
+        self.capacidade_min = np.array(capacidade_min)
+        self.media_latencia = np.array(media_latencia)
+        del self._passos
+
+    def resultado(self, atende):
+        """
+        Resultado do solver para cada requisito de uma grade.
+
+        Args:
+            atende (ndarray): (G, K+1) True se todos os nós são atendidos no
+                passo k com o requisito g da grade
+
+        Returns:
+            tuple: (n_fogs, media_latencia, fogs_inseridos), cada um com forma
+            (G,): o primeiro e o terceiro valores que o solver retornaria para
+            cada requisito, e o número de fogs inseridos além da cloud
+            (sum(fogs) - 1, que difere de n_fogs quando o solver retorna N)
+        """
+        elegiveis = atende if self.testa_ultimo else atende[:, :-1]
+        # Primeiro passo elegível que atende; a coluna extra marca "nenhum"
+        primeiro = np.column_stack([elegiveis, np.ones(len(atende), dtype=bool)]).argmax(axis=1)
+        encontrado = primeiro < elegiveis.shape[1]
+        passo = np.where(encontrado, primeiro, len(self.media_latencia) - 1)
+        n_fogs = np.where(encontrado, passo, self.n_nodes)
+        return n_fogs, self.media_latencia[passo], passo
+
+
+def trajetoria(metodo, latencias, capacidades, L_cloud_fog, C_cloud_fog, cloud_position, dados=None):
+    """
+    Executa a inserção gulosa da heurística até o fim, registrando o estado
+    após cada fog inserido.
+
+    Args:
+        metodo (str): Um dos nomes de METODOS
+        latencias, capacidades: Matrizes (N, N), como nos solvers
+        L_cloud_fog, C_cloud_fog: Requisitos entre os fogs e a cloud, nas
+            unidades dos solvers
+        cloud_position (int): Nó da cloud
+        dados: Sample, grafo ou CaracteristicasTopologia (só para as
+            heurísticas de conectividade)
+
+    Returns:
+        Trajetoria
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método desconhecido: {metodo}. Use um de {METODOS}")
+    uni = 0.025/2
+    L_cloud_fog = uni*L_cloud_fog
+    latencias = np.asarray(latencias, dtype=np.float64)
+    capacidades = np.asarray(capacidades, dtype=np.float64)
+    n_nodes = len(latencias)
+    node = cloud_position
+
+    if metodo == "excentricidade_cap_max_v2":
+        atendimento = AtribuicaoIncremental(latencias, [node], autoatendimento=False, criterio=-capacidades)
+    else:
+        atendimento = AtribuicaoIncremental(latencias, [node])
+    fog_atendido = (latencias[:, node] < L_cloud_fog) & (capacidades[:, node] > C_cloud_fog)
+
+    if metodo == "excentricidade_lat_min":
+        candidatos = [i for i in range(n_nodes) if latencias[i, node] < L_cloud_fog and i != node]
+        pontuacao = PontuacaoIncremental(latencias, candidatos, [node])
+        proximo = pontuacao.maior
+    elif metodo == "excentricidade_cap_max_v2":
+        candidatos = [i for i in range(n_nodes) if capacidades[i, node] > C_cloud_fog and i != node]
+        pontuacao = PontuacaoIncremental(capacidades, candidatos, [node])
+        proximo = pontuacao.menor
+    else:
+        pontuacao = None
+        decrescente = metodo == "conectividade_lat_max"
+        desempate = latencias[:, node] if decrescente else capacidades[:, node]
+        ordem = iter(ordem_por_grau(caracteristicas_de(dados).grau, desempate, node, decrescente).tolist())
+        proximo = lambda: next(ordem)
+
+    trajeto = Trajetoria(n_nodes, testa_ultimo=pontuacao is None)
+    while True:
+        trajeto._registra(latencias, capacidades, atendimento, fog_atendido)
+        if pontuacao is not None and not pontuacao.restantes():
+            break
+        if pontuacao is None and atendimento.fogs.sum() >= n_nodes:
+            break
+        no_fog = proximo()
+        if pontuacao is not None:
+            pontuacao.adiciona(no_fog)
+        atendimento.adiciona(no_fog)
+        trajeto.inseridos.append(no_fog)
+    trajeto._fecha()
+    return trajeto
+
+
+def varre_latencia(metodo, latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, cloud_position, dados=None):
+    """
+    Resultado da heurística para cada L_max de uma grade, com uma única
+    execução da inserção gulosa.
+
+    Args:
+        L_max: Grade (G,) de requisitos de latência, em ms
+
+    Demais argumentos como em trajetoria e nos solvers.
+
+    Returns:
+        tuple: (n_fogs, media_latencia, fogs_inseridos), como em
+        Trajetoria.resultado
+    """
+    trajeto = trajetoria(metodo, latencias, capacidades, L_cloud_fog, C_cloud_fog, cloud_position, dados)
+    L_max = 0.025/2 * np.asarray(L_max, dtype=np.float64)
+    atende = (trajeto.fogs_atendidos & (trajeto.capacidade_min > C_min)
+              & (trajeto.latencia_max < L_max[:, None]))
+    return trajeto.resultado(atende)
+
+
+def varre_capacidade(metodo, latencias, capacidades, L_max, C_min, L_cloud_fog, C_cloud_fog, cloud_position, dados=None):
+    """
+    Resultado da heurística para cada C_min de uma grade, com L_max fixo e
+    uma única execução da inserção gulosa.
+
+    Args:
+        C_min: Grade (G,) de requisitos de capacidade
+
+    Demais argumentos como em trajetoria e nos solvers.
+
+    Returns:
+        tuple: (n_fogs, media_latencia, fogs_inseridos), como em
+        Trajetoria.resultado
+    """
+    trajeto = trajetoria(metodo, latencias, capacidades, L_cloud_fog, C_cloud_fog, cloud_position, dados)
+    L_max = 0.025/2*L_max
+    C_min = np.asarray(C_min, dtype=np.float64)
+    atende = (trajeto.fogs_atendidos & (trajeto.latencia_max < L_max)
+              & (trajeto.capacidade_min > C_min[:, None]))
+    return trajeto.resultado(atende)